@@ -0,0 +1,218 @@
+"""
+AI Conversation in Kenya - Keyword Co-occurrence Engine
+Builds sparse term x term (and term x company) co-occurrence matrices from
+cleaned post text in vectorized batches, prunes edges by count or PMI, exports
+the strongest subgraph to networkx and caches spring layouts per graph.
+"""
+
+import os
+import json
+import hashlib
+import logging
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import networkx as nx
+import scipy.sparse as sp
+
+logger = logging.getLogger(__name__)
+
+LAYOUT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'cache', 'layouts')
+
+DEFAULT_STOPWORDS = {
+    'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'a', 'an',
+    'is', 'are', 'was', 'were', 'has', 'have', 'had', 'this', 'that', 'from', 'our', 'we',
+    'will', 'be', 'it', 'its', 'as', 'you', 'your', 'their', 'they', 'not', 'can', 'more'
+}
+
+
+class CooccurrenceEngine:
+    """Incrementally maintained sparse co-occurrence counts.
+
+    ``pairs`` holds term x term document co-occurrence counts (the diagonal
+    is each term's document frequency); ``company_pairs`` holds term x
+    company counts. Adding a batch only multiplies that batch's document-term
+    matrix, so new posts never trigger a full recomputation.
+    """
+
+    def __init__(self, stopwords=DEFAULT_STOPWORDS, min_length=2):
+        self.stopwords = set(stopwords)
+        self.min_length = min_length
+        self.vocab = {}
+        self.companies = {}
+        self.documents = 0
+        self.pairs = sp.csr_matrix((0, 0), dtype=np.int64)
+        self.company_pairs = sp.csr_matrix((0, 0), dtype=np.int64)
+
+    @property
+    def terms(self):
+        return list(self.vocab)
+
+    def _index(self, lookup, key):
+        index = lookup.get(key)
+        if index is None:
+            index = lookup[key] = len(lookup)
+        return index
+
+    def _vocab_codes(self, uniques):
+        """Global vocabulary indices for a batch's unique tokens, adding unseen ones"""
+        codes = pd.Index(list(self.vocab)).get_indexer(uniques) if self.vocab else np.full(len(uniques), -1)
+        new = np.flatnonzero(codes < 0)
+        codes[new] = np.arange(len(self.vocab), len(self.vocab) + len(new))
+        self.vocab.update(zip(uniques[new].tolist(), codes[new].tolist()))
+        return codes
+
+    def _document_term_matrix(self, texts):
+        """Binary docs x terms CSR matrix for one batch of cleaned texts"""
+        texts = pa.array(pd.array(texts, dtype='string'), type=pa.string())
+        tokens = pc.utf8_split_whitespace(texts)
+        lengths = pc.list_value_length(tokens).fill_null(0).to_numpy()
+        flat = pc.list_flatten(tokens)
+        docs = np.repeat(np.arange(len(texts)), lengths)
+
+        keep = pc.and_(pc.greater_equal(pc.utf8_length(flat), self.min_length),
+                       pc.invert(pc.is_in(flat, value_set=pa.array(sorted(self.stopwords), pa.string()))))
+        keep = keep.to_numpy(zero_copy_only=False)
+        local, uniques = pd.factorize(flat.filter(keep).to_numpy(zero_copy_only=False))
+        columns = self._vocab_codes(uniques)[local] if len(uniques) else local
+
+        # Summing duplicate (doc, term) entries, then clamping, gives presence per document
+        matrix = sp.csr_matrix((np.ones(len(columns), dtype=np.int64), (docs[keep], columns)),
+                               shape=(len(texts), len(self.vocab)))
+        matrix.data[:] = 1
+        return matrix
+
+    @staticmethod
+    def _grow(matrix, shape):
+        """Pad a sparse matrix with empty rows/columns up to ``shape``"""
+        if matrix.shape == shape:
+            return matrix
+        matrix = matrix.tocoo()
+        return sp.csr_matrix((matrix.data, (matrix.row, matrix.col)), shape=shape)
+
+    def add_posts(self, texts, companies=None):
+        """Fold a batch of cleaned texts (and optional matching companies) into the counts"""
+        texts = list(texts)
+        doc_terms = self._document_term_matrix(texts)
+        size = len(self.vocab)
+
+        batch_pairs = (doc_terms.T @ doc_terms).tocsr()
+        self.pairs = self._grow(self.pairs, (size, size)) + batch_pairs
+
+        if companies is not None:
+            codes = np.array([self._index(self.companies, company) if isinstance(company, str) else -1
+                              for company in companies])
+            keep = np.flatnonzero(codes >= 0)
+            doc_companies = sp.csr_matrix(
+                (np.ones(len(keep), dtype=np.int64), (keep, codes[keep])),
+                shape=(len(texts), len(self.companies)))
+            batch_company = (doc_terms.T @ doc_companies).tocsr()
+            self.company_pairs = self._grow(self.company_pairs, (size, len(self.companies))) + batch_company
+
+        self.documents += len(texts)
+        logger.info(f"Added {len(texts)} posts; vocabulary now {size} terms")
+        return self
+
+    def edges(self, min_count=2, min_pmi=None, top_n=None):
+        """Return term pairs as a DataFrame (source, target, count, pmi), strongest first"""
+        upper = sp.triu(self.pairs, k=1).tocoo()
+        frame = pd.DataFrame({'i': upper.row, 'j': upper.col, 'count': upper.data})
+        frame = frame[frame['count'] >= min_count]
+
+        doc_freq = self.pairs.diagonal()
+        with np.errstate(divide='ignore'):
+            frame['pmi'] = np.log(frame['count'] * self.documents /
+                                  (doc_freq[frame['i']] * doc_freq[frame['j']]))
+        if min_pmi is not None:
+            frame = frame[frame['pmi'] >= min_pmi]
+
+        frame = frame.sort_values(['count', 'pmi'], ascending=False)
+        if top_n is not None:
+            frame = frame.head(top_n)
+
+        terms = np.array(self.terms, dtype=object)
+        return pd.DataFrame({
+            'source': terms[frame['i'].to_numpy()],
+            'target': terms[frame['j'].to_numpy()],
+            'count': frame['count'].to_numpy(),
+            'pmi': frame['pmi'].round(4).to_numpy(),
+        })
+
+    def company_terms(self, company, top_n=20):
+        """Most frequent terms in a company's posts"""
+        column = self.company_pairs[:, self.companies[company]].toarray().ravel()
+        order = np.argsort(column)[::-1][:top_n]
+        terms = self.terms
+        return pd.Series({terms[i]: int(column[i]) for i in order if column[i] > 0}, name=company)
+
+    def to_networkx(self, min_count=2, min_pmi=None, top_n=100):
+        """Export the strongest edges as a weighted networkx graph"""
+        edges = self.edges(min_count=min_count, min_pmi=min_pmi, top_n=top_n)
+        G = nx.from_pandas_edgelist(edges, 'source', 'target', edge_attr=['count', 'pmi'])
+        doc_freq = self.pairs.diagonal()
+        nx.set_node_attributes(G, {node: int(doc_freq[self.vocab[node]]) for node in G}, 'doc_freq')
+        return G
+
+    def save(self, path):
+        """Persist counts to ``<path>_pairs.npz`` / ``<path>_companies.npz`` and vocabularies to ``<path>.json``"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        sp.save_npz(path + '_pairs.npz', self.pairs)
+        sp.save_npz(path + '_companies.npz', self.company_pairs)
+        with open(path + '.json', 'w', encoding='utf-8') as f:
+            json.dump({'vocab': self.terms, 'companies': list(self.companies),
+                       'documents': self.documents, 'min_length': self.min_length,
+                       'stopwords': sorted(self.stopwords)}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path):
+        with open(path + '.json', encoding='utf-8') as f:
+            meta = json.load(f)
+        engine = cls(stopwords=meta['stopwords'], min_length=meta['min_length'])
+        engine.vocab = {term: i for i, term in enumerate(meta['vocab'])}
+        engine.companies = {company: i for i, company in enumerate(meta['companies'])}
+        engine.documents = meta['documents']
+        engine.pairs = sp.load_npz(path + '_pairs.npz').tocsr()
+        engine.company_pairs = sp.load_npz(path + '_companies.npz').tocsr()
+        return engine
+
+
+def graph_fingerprint(G):
+    """Stable hash of a graph's nodes and weighted edges"""
+    digest = hashlib.sha1()
+    for node in sorted(map(str, G.nodes())):
+        digest.update(node.encode())
+        digest.update(b'\0')
+    edges = sorted('|'.join(sorted((str(u), str(v)))) + f'|{data.get("count", data.get("weight", 1))}'
+                   for u, v, data in G.edges(data=True))
+    for edge in edges:
+        digest.update(edge.encode() + b'\n')
+    return digest.hexdigest()[:16]
+
+
+def cached_layout(G, cache_dir=LAYOUT_CACHE_DIR, k=1, iterations=50, seed=42, initial=None):
+    """nx.spring_layout, cached on disk by graph fingerprint and layout parameters.
+
+    ``initial`` (e.g. the previous layout of a smaller graph) seeds positions
+    for nodes that already had them, so an updated graph converges quickly
+    and keeps a familiar shape.
+    """
+    key = f'{graph_fingerprint(G)}_k{k}_i{iterations}_s{seed}'
+    path = os.path.join(cache_dir, f'{key}.json')
+
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            stored = json.load(f)
+        lookup = {str(node): node for node in G.nodes()}
+        return {lookup[name]: np.array(xy) for name, xy in stored.items() if name in lookup}
+
+    pos = None
+    if initial:
+        pos = {node: initial[node] for node in G.nodes() if node in initial} or None
+    layout = nx.spring_layout(G, k=k, iterations=iterations, seed=seed, pos=pos)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({str(node): [float(x), float(y)] for node, (x, y) in layout.items()}, f)
+    return layout
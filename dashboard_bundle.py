@@ -0,0 +1,163 @@
+"""
+AI Conversation in Kenya - Dashboard Data Bundle
+Writes the data behind index.html as a versioned bundle: a small manifest plus
+per-view chunks in a compact columnar JSON layout, each pre-compressed with
+gzip, so the dashboard only fetches what the current view needs.
+"""
+
+import os
+import re
+import json
+import gzip
+import shutil
+import hashlib
+import logging
+from datetime import datetime
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_DIR = os.path.join('visuals', 'bundle')
+BUNDLE_FORMAT = 1
+
+
+def _slug(key):
+    """Turn a chunk key (month, sector name...) into a safe file name"""
+    return re.sub(r'[^a-z0-9]+', '-', str(key).lower()).strip('-') or 'chunk'
+
+
+def _file_names(keys):
+    """Map keys to distinct file names; keys whose slugs collide get a short hash suffix"""
+    slugs = {key: _slug(key) for key in keys}
+    counts = {}
+    for slug in slugs.values():
+        counts[slug] = counts.get(slug, 0) + 1
+    return {key: slug if counts[slug] == 1
+            else f"{slug}-{hashlib.sha1(str(key).encode('utf-8')).hexdigest()[:8]}"
+            for key, slug in slugs.items()}
+
+
+def _json_value(value):
+    if pd.isna(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+
+def columnar(df):
+    """Encode a DataFrame as {"columns": [...], "data": [[col0...], [col1...]]}"""
+    return {
+        'columns': [str(col) for col in df.columns],
+        'data': [[_json_value(v) for v in df[col].tolist()] for col in df.columns],
+    }
+
+
+def _encode(payload):
+    if isinstance(payload, pd.DataFrame):
+        rows = len(payload)
+        payload = columnar(payload)
+    else:
+        rows = None
+    raw = json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return raw, rows
+
+
+def write_bundle(views, out_dir=BUNDLE_DIR, keep=3):
+    """Write ``{view: {chunk_key: DataFrame | dict}}`` as a versioned bundle.
+
+    Chunks go to ``<out_dir>/<version>/<view>/<slug>.json`` (and ``.json.gz``),
+    where ``version`` is a hash of their contents, so chunk files never change
+    once written and can be cached indefinitely. ``<out_dir>/manifest.json``
+    points at the current version and is the only file the dashboard
+    revalidates. Only the newest ``keep`` versions are left on disk.
+    """
+    encoded = {}
+    digest = hashlib.sha1(f'bundle-v{BUNDLE_FORMAT}'.encode())
+    for view in sorted(views):
+        for key in sorted(views[view], key=str):
+            raw, rows = _encode(views[view][key])
+            encoded[(view, key)] = (raw, rows)
+            digest.update(f'{view}/{key}'.encode())
+            digest.update(raw)
+    version = digest.hexdigest()[:12]
+
+    manifest = {
+        'format': BUNDLE_FORMAT,
+        'version': version,
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'views': {},
+    }
+
+    view_names = _file_names(views)
+    chunk_names = {view: _file_names(views[view]) for view in views}
+    for (view, key), (raw, rows) in encoded.items():
+        rel_path = f'{version}/{view_names[view]}/{chunk_names[view][key]}.json'
+        path = os.path.join(out_dir, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with open(path, 'wb') as f:
+            f.write(raw)
+        # mtime=0 keeps the compressed bytes stable between runs
+        compressed = gzip.compress(raw, compresslevel=9, mtime=0)
+        with open(path + '.gz', 'wb') as f:
+            f.write(compressed)
+
+        chunk = {'path': rel_path, 'gzip': rel_path + '.gz',
+                 'bytes': len(raw), 'gzip_bytes': len(compressed)}
+        if rows is not None:
+            chunk['rows'] = rows
+        manifest['views'].setdefault(view, {'chunks': {}})['chunks'][str(key)] = chunk
+
+    os.makedirs(out_dir, exist_ok=True)
+    tmp_path = os.path.join(out_dir, 'manifest.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(out_dir, 'manifest.json'))
+
+    _prune_versions(out_dir, keep=keep, current=version)
+    total = sum(len(raw) for raw, _ in encoded.values())
+    logger.info(f"Wrote bundle {version} with {len(encoded)} chunks ({total} bytes) to {out_dir}")
+    return manifest
+
+
+def _prune_versions(out_dir, keep, current):
+    """Delete all but the ``keep`` most recent version directories"""
+    versions = [os.path.join(out_dir, name) for name in os.listdir(out_dir)
+                if os.path.isdir(os.path.join(out_dir, name))]
+    versions.sort(key=os.path.getmtime, reverse=True)
+    for path in versions[keep:]:
+        if os.path.basename(path) != current:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def rollup_views(store):
+    """Build views from a RollupStore: daily activity per month, monthly activity per sector
+    and company totals"""
+    views = {}
+
+    daily = store.query('all', grain='day')
+    if not daily.empty:
+        daily['day'] = daily['bucket'].dt.strftime('%Y-%m-%d')
+        columns = ['day', 'posts', 'likes', 'comments', 'shares', 'engagement', 'max_engagement']
+        views['timeseries'] = {month: frame[columns]
+                               for month, frame in daily.groupby(daily['bucket'].dt.strftime('%Y-%m'))}
+
+    sectors = store.query('sector', grain='day')
+    if not sectors.empty:
+        sectors['month'] = sectors['bucket'].dt.strftime('%Y-%m')
+        monthly = sectors.groupby(['value', 'month']).agg(
+            posts=('posts', 'sum'), engagement=('engagement', 'sum'),
+            max_engagement=('max_engagement', 'max')).reset_index()
+        views['sectors'] = {sector: frame.drop(columns='value')
+                            for sector, frame in monthly.groupby('value')}
+
+    companies = store.totals('company')
+    if not companies.empty:
+        columns = ['company', 'posts', 'engagement', 'avg_engagement', 'max_engagement']
+        views['companies'] = {'all': companies.reset_index().rename(columns={'value': 'company'})[columns]}
+
+    return views
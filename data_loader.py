@@ -0,0 +1,297 @@
+"""
+AI Conversation in Kenya - Typed Data Loader
+Loads collected CSVs with an explicit schema and caches the cleaned result as
+an uncompressed Arrow/Feather file that later sessions memory-map.
+"""
+
+import os
+import glob
+import hashlib
+import logging
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from text_cleaning import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Bump when the schema or cleaning logic changes so stale caches are ignored
+SCHEMA_VERSION = 5
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+CACHE_DIRNAME = 'cache'
+
+PLATFORM_LABELS = {'twitter': 'Twitter', 'linkedin': 'LinkedIn', 'manual': 'Manual'}
+
+# Separates the run id from the company in per-company file names
+RUN_SEPARATOR = '__'
+
+CATEGORY_COLUMNS = ['platform', 'company', 'company_handle', 'sector', 'seniority_level',
+                    'company_size', 'query']
+
+# Per-source file pattern, columns to read (with dtypes) and renames onto the
+# shared analysis schema: content / post_date / company / engagement counts.
+SOURCES = {
+    'twitter': {
+        'pattern': 'twitter_data_*.csv',
+        'dtypes': {
+            'tweet_id': 'string',
+            'created_at': 'string',
+            'text': 'string',
+            'clean_text': 'string',
+            'username': 'string',
+            'user_followers': 'Int64',
+            'user_verified': 'boolean',
+            'retweet_count': 'Int64',
+            'like_count': 'Int64',
+            'reply_count': 'Int64',
+            'quote_count': 'Int64',
+            'query': 'category',
+        },
+        'rename': {
+            'created_at': 'post_date',
+            'text': 'content',
+            'clean_text': 'clean_content',
+            'like_count': 'likes',
+            'reply_count': 'comments',
+            'retweet_count': 'shares',
+        },
+    },
+    'linkedin': {
+        'pattern': 'linkedin_posts_*.csv',
+        'dtypes': {
+            'post_urn': 'string',
+            'posted_at': 'string',
+            'text': 'string',
+            'content': 'string',
+            'clean_text': 'string',
+            'author_name': 'string',
+            'author_title': 'string',
+            'likes': 'Int64',
+            'comments': 'Int64',
+            'shares': 'Int64',
+            'timestamp': 'string',
+            'company': 'category',
+            'company_handle': 'category',
+            'sector': 'category',
+            'seniority_level': 'category',
+            'company_size': 'category',
+        },
+        'rename': {
+            'text': 'content',
+            'clean_text': 'clean_content',
+            'timestamp': 'post_date',
+        },
+    },
+    'manual': {
+        'pattern': 'manual_collection_*.csv',
+        'dtypes': {
+            'post_date': 'string',
+            'author_name': 'string',
+            'author_title': 'string',
+            'author_company': 'category',
+            'seniority_level': 'category',
+            'company_size': 'category',
+            'post_text': 'string',
+            'platform': 'category',
+            'likes': 'Int64',
+            'comments': 'Int64',
+            'shares': 'Int64',
+        },
+        'rename': {
+            'author_company': 'company',
+            'post_text': 'content',
+        },
+    },
+}
+
+
+def run_key(path):
+    """Collection run a data file belongs to.
+
+    Queued scrapes write one file per company, named
+    ``<prefix>_<run>__<company>.csv``; files of the same run share the part
+    before ``RUN_SEPARATOR``. Any other file is a run of its own.
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return stem.split(RUN_SEPARATOR)[0]
+
+
+def find_source_files(source, data_dir=DATA_DIR, latest_only=True):
+    """Return the CSV files for a source, optionally only those of the most recent run"""
+    files = sorted(glob.glob(os.path.join(data_dir, SOURCES[source]['pattern'])))
+    if latest_only and files:
+        latest = run_key(max(files, key=os.path.getmtime))
+        return [path for path in files if run_key(path) == latest]
+    return files
+
+
+def fingerprint(files):
+    """Hash file paths, sizes and modification times together with the schema version"""
+    digest = hashlib.sha1(f'schema-v{SCHEMA_VERSION}'.encode())
+    for path in sorted(files):
+        stat = os.stat(path)
+        digest.update(f'{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}'.encode())
+    return digest.hexdigest()[:16]
+
+
+def read_source_csv(path, source):
+    """Read one CSV with the pyarrow engine, only the schema columns and explicit dtypes"""
+    spec = SOURCES[source]
+    header = pd.read_csv(path, nrows=0).columns
+    usecols = [col for col in header if col in spec['dtypes']]
+    dtypes = {col: spec['dtypes'][col] for col in usecols}
+
+    df = pd.read_csv(path, engine='pyarrow', usecols=usecols, dtype=dtypes)
+    return to_analysis_schema(df, source)
+
+
+def to_analysis_schema(df, source):
+    """Rename a collector frame onto the shared analysis columns and tag its platform"""
+    df = df.rename(columns=SOURCES[source]['rename'])
+    if 'platform' not in df.columns:
+        df['platform'] = PLATFORM_LABELS[source]
+    return df
+
+
+def post_keys(df):
+    """Stable per-post keys for an analysis-schema frame.
+
+    ``<platform>:<tweet id or LinkedIn URN>``, falling back to a hash of
+    platform, company and text for rows without a native id.
+    """
+    platform = df['platform'].astype('string').fillna('')
+    company = df['company'] if 'company' in df.columns else pd.Series('', index=df.index)
+    company = company.astype('string').fillna('')
+    content = df['content'].astype('string').fillna('')
+    hashed = pd.Series([
+        hashlib.sha1(f'{p}|{c}|{t}'.encode('utf-8')).hexdigest()
+        for p, c, t in zip(platform, company, content)
+    ], index=df.index, dtype='string')
+
+    native = pd.Series(pd.NA, index=df.index, dtype='string')
+    for col in ('tweet_id', 'post_urn'):
+        if col in df.columns:
+            native = native.fillna(df[col].astype('string'))
+    return platform.str.lower() + ':' + native.fillna(hashed)
+
+
+def _prepare(frames):
+    """Combine raw frames and derive the cleaned analysis columns"""
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+    for col in ('post_date', 'posted_at'):
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], format='ISO8601', errors='coerce', utc=True)
+    if 'content' in df.columns:
+        # Collectors store cleaned text alongside the raw text; only fill the gaps
+        if 'clean_content' not in df.columns:
+            df['clean_content'] = normalize_text(df['content'])
+        else:
+            missing = df['clean_content'].isna() & df['content'].notna()
+            if missing.any():
+                df.loc[missing, 'clean_content'] = normalize_text(df.loc[missing, 'content'])
+
+    # concat drops categorical dtypes whose categories differ between files
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+
+    return df
+
+
+def _cache_path(cache_dir, name, key):
+    return os.path.join(cache_dir, f'{name}_{key}.arrow')
+
+
+def _prune_cache(cache_dir, name, keep):
+    """Remove superseded cache files for the same dataset"""
+    for path in glob.glob(os.path.join(cache_dir, f'{name}_*.arrow')):
+        if path != keep:
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"Could not remove stale cache {path}: {str(e)}")
+
+
+def _arrow_backed(arrow_type):
+    """Keep strings, integers and booleans in their Arrow buffers instead of copying them.
+
+    Timestamps convert to numpy without a copy and keep the full ``.dt``
+    accessor; dictionary columns become pandas categoricals (small codes).
+    """
+    if (pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type)
+            or pa.types.is_integer(arrow_type) or pa.types.is_boolean(arrow_type)):
+        return pd.ArrowDtype(arrow_type)
+    return None
+
+
+def read_cache(path, arrow_dtypes=False):
+    """Open a cached dataset; uncompressed Arrow files are memory-mapped, so kernels share pages.
+
+    Columns come back with the loader's usual ``string``/``Int64``/``boolean``
+    dtypes, which copies them out of the map. With ``arrow_dtypes`` strings,
+    integers and booleans stay in the mapped buffers as ``pd.ArrowDtype``
+    columns; check that the analysis code used supports them before opting in.
+    """
+    table = feather.read_table(path, memory_map=True)
+    return table.to_pandas(types_mapper=_arrow_backed if arrow_dtypes else None)
+
+
+def _load_cached(name, build, files, data_dir, use_cache=True, arrow_dtypes=False):
+    """Return the dataset for ``files``, building and caching it on a miss"""
+    cache_dir = os.path.join(data_dir, CACHE_DIRNAME)
+    path = _cache_path(cache_dir, name, fingerprint(files))
+
+    if use_cache and os.path.exists(path):
+        logger.info(f"Loading {name} dataset from cache {path}")
+        return read_cache(path, arrow_dtypes)
+
+    df = build()
+    if use_cache:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = path + '.tmp'
+        feather.write_feather(df.reset_index(drop=True), tmp_path, compression='uncompressed')
+        os.replace(tmp_path, path)
+        _prune_cache(cache_dir, name, keep=path)
+        logger.info(f"Cached {len(df)} rows to {path}")
+        if arrow_dtypes:
+            # Same dtypes on a miss as on a hit
+            return read_cache(path, arrow_dtypes)
+    return df
+
+
+def load_source(source, data_dir=DATA_DIR, latest_only=True, use_cache=True, arrow_dtypes=False):
+    """Load one platform's posts (twitter, linkedin or manual).
+
+    ``arrow_dtypes`` keeps cached columns memory-mapped; see ``read_cache``.
+    """
+    files = find_source_files(source, data_dir, latest_only)
+    if not files:
+        raise FileNotFoundError(f"No {source} data files found in {data_dir}")
+
+    def build():
+        return _prepare([read_source_csv(path, source) for path in files])
+
+    return _load_cached(source, build, files, data_dir, use_cache, arrow_dtypes)
+
+
+def load_combined(data_dir=DATA_DIR, sources=('twitter', 'linkedin', 'manual'),
+                  latest_only=True, use_cache=True, arrow_dtypes=False):
+    """Load and combine posts from every available source.
+
+    ``arrow_dtypes`` keeps cached columns memory-mapped; see ``read_cache``.
+    """
+    found = {source: find_source_files(source, data_dir, latest_only) for source in sources}
+    found = {source: files for source, files in found.items() if files}
+    if not found:
+        raise FileNotFoundError(f"No data files found in {data_dir}")
+
+    def build():
+        return _prepare([read_source_csv(path, source)
+                         for source, files in found.items() for path in files])
+
+    all_files = [path for files in found.values() for path in files]
+    return _load_cached('combined', build, all_files, data_dir, use_cache, arrow_dtypes)
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+AI Conversation in Kenya - Engagement Metrics Refresh
+Re-reads public_metrics for stored tweets through batched tweet lookup
+(100 ids per call) and appends each observation as a time-series snapshot.
+Young tweets are refreshed often and old ones rarely, so the API budget goes
+where engagement is still changing.
+"""
+
+import os
+import sys
+import glob
+import sqlite3
+import logging
+import argparse
+from datetime import timedelta
+
+import pandas as pd
+
+from rate_limits import RateLimitScheduler, TWEET_LOOKUP
+from response_cache import bypass_response_cache
+
+logger = logging.getLogger(__name__)
+
+ENGAGEMENT_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'engagement.db')
+BATCH_SIZE = 100
+METRIC_COLUMNS = ['retweet_count', 'like_count', 'reply_count', 'quote_count']
+
+# (tweets younger than, refresh at most every); older tweets are no longer refreshed
+REFRESH_TIERS = [
+    (timedelta(days=1), timedelta(hours=1)),
+    (timedelta(days=7), timedelta(hours=12)),
+    (timedelta(days=30), timedelta(days=3)),
+    (timedelta(days=90), timedelta(days=14)),
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tweets (
+    tweet_id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    last_refreshed TEXT,
+    deleted INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS metric_snapshots (
+    tweet_id TEXT NOT NULL,
+    observed_at TEXT NOT NULL,
+    retweet_count INTEGER,
+    like_count INTEGER,
+    reply_count INTEGER,
+    quote_count INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_tweet ON metric_snapshots (tweet_id, observed_at);
+CREATE INDEX IF NOT EXISTS idx_tweets_created ON tweets (deleted, created_at);
+"""
+
+
+class MetricSnapshotStore:
+    """SQLite store of tracked tweet ids and their append-only metric snapshots"""
+
+    def __init__(self, path=ENGAGEMENT_DB):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def register(self, df):
+        """Track tweets from a frame with tweet_id and created_at columns"""
+        frame = df[['tweet_id', 'created_at']].dropna()
+        created = pd.to_datetime(frame['created_at'], format='ISO8601', utc=True)
+        rows = zip(frame['tweet_id'].astype(str), created.dt.strftime('%Y-%m-%dT%H:%M:%S'))
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany("INSERT OR IGNORE INTO tweets (tweet_id, created_at) VALUES (?, ?)", rows)
+            return self.conn.total_changes - before
+
+    def due(self, now=None, limit=None):
+        """Tweet ids whose refresh interval has elapsed, most overdue first"""
+        now = pd.Timestamp.now(tz='UTC') if now is None else pd.Timestamp(now)
+        if now.tzinfo is None:
+            now = now.tz_localize('UTC')
+        stamp = now.tz_convert('UTC').strftime('%Y-%m-%dT%H:%M:%S')
+        # Tweets older than the last tier are never refreshed, so the index skips them
+        oldest = (now - REFRESH_TIERS[-1][0]).tz_convert('UTC').strftime('%Y-%m-%dT%H:%M:%S')
+
+        tiers = ' '.join('WHEN age < ? THEN ?' for _ in REFRESH_TIERS)
+        params = []
+        for max_age, interval in REFRESH_TIERS:
+            params += [max_age.total_seconds(), interval.total_seconds()]
+        params += [stamp, stamp, oldest]
+        sql = f"""
+            SELECT tweet_id FROM (
+                SELECT tweet_id, last_refreshed, since, CASE {tiers} END AS interval
+                FROM (
+                    SELECT tweet_id, last_refreshed,
+                           (julianday(?) - julianday(created_at)) * 86400 AS age,
+                           (julianday(?) - julianday(last_refreshed)) * 86400 AS since
+                    FROM tweets WHERE deleted = 0 AND created_at > ?
+                )
+            )
+            WHERE interval IS NOT NULL AND (last_refreshed IS NULL OR since >= interval)
+            -- Never-refreshed tweets come first; the rest by how far past their interval they are
+            ORDER BY last_refreshed IS NOT NULL, since / interval DESC
+        """
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [row[0] for row in self.conn.execute(sql, params)]
+
+    def record(self, snapshots, refreshed_ids, deleted_ids, observed_at):
+        """Append snapshot rows and update refresh bookkeeping in one transaction"""
+        stamp = pd.Timestamp(observed_at).strftime('%Y-%m-%dT%H:%M:%S')
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO metric_snapshots VALUES (?, ?, ?, ?, ?, ?)",
+                [(tweet_id, stamp) + tuple(metrics.get(col) for col in METRIC_COLUMNS)
+                 for tweet_id, metrics in snapshots])
+            self.conn.executemany("UPDATE tweets SET last_refreshed = ? WHERE tweet_id = ?",
+                                  [(stamp, tweet_id) for tweet_id in refreshed_ids])
+            self.conn.executemany("UPDATE tweets SET deleted = 1 WHERE tweet_id = ?",
+                                  [(tweet_id,) for tweet_id in deleted_ids])
+
+    def snapshots(self, tweet_ids=None):
+        """Metric time series, one row per (tweet, observation)"""
+        sql = "SELECT * FROM metric_snapshots"
+        params = []
+        if tweet_ids is not None:
+            tweet_ids = list(tweet_ids)
+            sql += f" WHERE tweet_id IN ({', '.join('?' * len(tweet_ids))})"
+            params = tweet_ids
+        df = pd.read_sql_query(sql + " ORDER BY tweet_id, observed_at", self.conn, params=params)
+        df['observed_at'] = pd.to_datetime(df['observed_at'], utc=True)
+        return df
+
+    def latest(self):
+        """Most recent snapshot per tweet"""
+        df = pd.read_sql_query(
+            "SELECT s.* FROM metric_snapshots s JOIN ("
+            "  SELECT tweet_id, MAX(observed_at) AS observed_at FROM metric_snapshots GROUP BY tweet_id"
+            ") m ON s.tweet_id = m.tweet_id AND s.observed_at = m.observed_at "
+            "ORDER BY s.tweet_id", self.conn)
+        df['observed_at'] = pd.to_datetime(df['observed_at'], utc=True)
+        return df.drop_duplicates('tweet_id', keep='last').reset_index(drop=True)
+
+
+def queue_refresh(client, store, scheduler, max_tweets=None, now=None):
+    """Queue lookups for due tweets on ``scheduler`` without running them.
+
+    Lets the lookups share a scheduler run with other endpoints' calls.
+    ``scheduler`` must already be attached to ``client``. Returns a list that
+    receives the number of snapshots written by each finished lookup.
+    """
+    written = []
+    ids = store.due(now=now, limit=max_tweets)
+    if not ids:
+        logger.info("No tweets due for an engagement refresh")
+        return written
+
+    # Lookups always go straight to the API: refreshed metrics must never be replayed
+    client = bypass_response_cache(client)
+
+    def handle(response, batch_ids):
+        observed_at = pd.Timestamp.now(tz='UTC')
+        snapshots = [(str(tweet.id), tweet.public_metrics) for tweet in (response.data or [])]
+        refreshed = {tweet_id for tweet_id, _ in snapshots}
+        # Ids missing from the response were deleted or made private
+        deleted = [tweet_id for tweet_id in batch_ids if tweet_id not in refreshed]
+        store.record(snapshots, refreshed, deleted, observed_at)
+        written.append(len(snapshots))
+
+    for start in range(0, len(ids), BATCH_SIZE):
+        batch_ids = ids[start:start + BATCH_SIZE]
+        scheduler.submit(TWEET_LOOKUP, client.get_tweets, ids=batch_ids, tweet_fields=['public_metrics'],
+                         on_result=lambda response, batch_ids=batch_ids: handle(response, batch_ids))
+
+    logger.info(f"Refreshing metrics for {len(ids)} tweets in {-(-len(ids) // BATCH_SIZE)} lookups")
+    return written
+
+
+def refresh_metrics(client, store, scheduler=None, max_tweets=None, workers=4, now=None):
+    """Refresh due tweets in batches of 100 ids; returns the number of snapshots written.
+
+    Lookups bypass the response cache, which cannot be used from the worker
+    threads either.
+    """
+    client = bypass_response_cache(client)
+    scheduler = scheduler or RateLimitScheduler().attach(client)
+    written = queue_refresh(client, store, scheduler, max_tweets, now)
+    if not scheduler.pending():
+        return 0
+
+    scheduler.run(workers=workers)
+    total = sum(written)
+    logger.info(f"Wrote {total} metric snapshots")
+    return total
+
+
+def register_collected_tweets(store, data_dir):
+    """Track every tweet id found in the collected twitter_data CSVs"""
+    added = 0
+    for path in sorted(glob.glob(os.path.join(data_dir, 'twitter_data_*.csv'))):
+        header = pd.read_csv(path, nrows=0).columns
+        if 'tweet_id' not in header:
+            continue
+        df = pd.read_csv(path, engine='pyarrow', usecols=['tweet_id', 'created_at'], dtype='string')
+        added += store.register(df)
+    logger.info(f"Registered {added} new tweets for engagement tracking")
+    return added
+
+
+def main(argv=None):
+    from data_loader import DATA_DIR
+    from twitter_collector import setup_twitter_client
+
+    parser = argparse.ArgumentParser(description='Refresh engagement metrics for stored tweets')
+    parser.add_argument('--db', default=ENGAGEMENT_DB)
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--max-tweets', type=int, help='cap on tweets refreshed this run')
+    parser.add_argument('--workers', type=int, default=4, help='concurrent lookup calls')
+    args = parser.parse_args(argv)
+
+    store = MetricSnapshotStore(args.db)
+    try:
+        register_collected_tweets(store, args.data_dir)
+        refresh_metrics(setup_twitter_client(), store, max_tweets=args.max_tweets, workers=args.workers)
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    sys.exit(main())
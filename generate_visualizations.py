@@ -12,9 +12,11 @@ from wordcloud import WordCloud
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import re
 import os
 from collections import Counter
+from dashboard_bundle import write_bundle, rollup_views
+from rollups import RollupStore, ROLLUP_DB
+from text_cleaning import normalize_text
 
 # Set style
 plt.style.use('default')
@@ -101,9 +103,9 @@ plt.close()
 
 # 3. Word Cloud Generation
 print('☁️ Creating word cloud...')
-all_text = ' '.join(twitter_df['tweet_text'])
 # Clean text for word cloud
-all_text = re.sub(r'[^\w\s]', '', all_text.lower())
+twitter_df['clean_text'] = normalize_text(twitter_df['tweet_text'], strip_digits=False)
+all_text = ' '.join(twitter_df['clean_text'])
 wordcloud = WordCloud(width=800, height=400, background_color='white', 
                      colormap='viridis', max_words=100).generate(all_text)
 
@@ -118,7 +120,7 @@ plt.close()
 print('🔍 Analyzing top keywords...')
 # Extract important words
 stop_words = {'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'a', 'an', 'is', 'are', 'was', 'were', 'has', 'have', 'had'}
-words = re.findall(r'\b\w+\b', all_text.lower())
+words = all_text.split()
 filtered_words = [word for word in words if len(word) > 3 and word not in stop_words]
 word_counts = Counter(filtered_words)
 top_words = dict(word_counts.most_common(10))
@@ -183,6 +185,22 @@ import json
 with open('visuals/insights.json', 'w') as f:
     json.dump(insights, f, indent=2)
 
+# Versioned, chunked data bundle for the dashboard
+print('📦 Writing dashboard data bundle...')
+category_table = twitter_df.groupby(['category', 'sentiment']).agg(
+    posts=('engagement_score', 'size'),
+    engagement=('engagement_score', 'sum'),
+    max_engagement=('engagement_score', 'max')
+).reset_index()
+bundle_views = {
+    'summary': {'latest': insights},
+    'categories': {'all': category_table}
+}
+if os.path.exists(ROLLUP_DB):
+    with RollupStore(ROLLUP_DB) as store:
+        bundle_views.update(rollup_views(store))
+manifest = write_bundle(bundle_views)
+
 print('\n✅ Visualization generation complete!')
 print(f'📁 All files saved to visuals/ directory')
 print(f'📊 Key Insights:')
@@ -191,6 +209,8 @@ print(f'   • Average engagement score: {insights["avg_engagement"]:.1f}')
 print(f'   • Highest performing category: {insights["top_category"]} ({insights["highest_engagement"]} engagement)')
 print(f'   • Most discussed categories: {", ".join(list(insights["category_counts"].keys())[:3])}')
 
+print(f'   • Dashboard bundle version: {manifest["version"]}')
+
 # Display file listing
 print(f'\n📋 Generated files:')
 for file in os.listdir('visuals'):
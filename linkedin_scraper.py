@@ -1,9 +1,9 @@
 import os
+import re
 import time
-import json
 import random
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 import pandas as pd
 from dotenv import load_dotenv
 from selenium import webdriver
@@ -15,6 +15,14 @@ from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
+from records import LinkedInPost, LinkedInBatch
+from rollups import update_rollups
+from search_index import update_search_index
+from scrape_queue import JobQueue, QUEUE_DB, DONE, FAILED, work
+from page_archive import PageArchive
+from seen_posts import SeenPostStore
+from data_loader import find_source_files, RUN_SEPARATOR
+from text_cleaning import normalize_text
 
 # Set up logging
 logging.basicConfig(
@@ -30,8 +38,24 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+# Relative post ages as LinkedIn shows them: "45m", "5h", "2d", "3w", "1mo", "1yr"
+AGE_PATTERN = re.compile(r'(\d+)\s*(mo|yr|y|w|d|h|m|s)\b')
+AGE_UNITS = {
+    's': timedelta(seconds=1), 'm': timedelta(minutes=1), 'h': timedelta(hours=1),
+    'd': timedelta(days=1), 'w': timedelta(weeks=1), 'mo': timedelta(days=30),
+    'y': timedelta(days=365), 'yr': timedelta(days=365)
+}
+
+def parse_post_age(text, now=None):
+    """Convert a relative age like "3d" into an approximate posting datetime"""
+    match = AGE_PATTERN.search(text or '')
+    if not match:
+        return None
+    now = now or datetime.now()
+    return now - int(match.group(1)) * AGE_UNITS[match.group(2)]
+
 class LinkedInScraper:
-    def __init__(self):
+    def __init__(self, start_driver=True):
         # Top Companies by Revenue and Employee Size
         self.COMPANY_PAGES = {
             # Financial Services
@@ -91,6 +115,7 @@ class LinkedInScraper:
             'post_text': 'div.feed-shared-update-v2__description span.break-words',
             'author_name': 'span.feed-shared-actor__name',
             'author_title': 'span.feed-shared-actor__description',
+            'post_age': 'span.feed-shared-actor__sub-description',
             'engagement_stats': 'ul.social-details-social-counts',
             'likes': 'button.social-details-social-counts__reactions-count',
             'comments': 'button.social-details-social-counts__comments',
@@ -107,7 +132,11 @@ class LinkedInScraper:
             "fintech", "cyber security", "big data", "analytics"
         ]
         
-        self.setup_driver()
+        # Re-parsing archived pages only needs the selectors and extraction logic
+        self.archive = None
+        if start_driver:
+            self.archive = PageArchive()
+            self.setup_driver()
     
     def setup_driver(self):
         """Configure and initialize the Chrome WebDriver with optimal settings"""
@@ -172,8 +201,13 @@ class LinkedInScraper:
         except Exception as e:
             logger.error(f"Error during scrolling: {str(e)}")
 
-    def extract_post_data(self, post):
-        """Extract data from a single post"""
+    def extract_post_data(self, post, now=None):
+        """Extract data from a single post.
+
+        ``now`` is when the page was fetched; relative ages ("3d") are
+        measured from it. Defaults to the current time for live pages.
+        """
+        now = now or datetime.now()
         try:
             # Get post text
             try:
@@ -195,6 +229,14 @@ class LinkedInScraper:
             except NoSuchElementException:
                 author_title = ""
             
+            # Get post URN and approximate posting time
+            post_urn = post.get_attribute('data-urn') or None
+            try:
+                age_text = post.find_element(By.CSS_SELECTOR, self.SELECTORS['post_age']).text
+                posted_at = parse_post_age(age_text, now)
+            except NoSuchElementException:
+                posted_at = None
+            
             # Get engagement metrics
             try:
                 likes = post.find_element(By.CSS_SELECTOR, self.SELECTORS['likes']).text
@@ -215,21 +257,152 @@ class LinkedInScraper:
                 shares = 0
             
             return {
+                'post_urn': post_urn,
+                'posted_at': posted_at,
                 'text': text,
                 'author_name': author_name,
                 'author_title': author_title,
                 'likes': likes,
                 'comments': comments,
                 'shares': shares,
-                'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                'timestamp': now.strftime("%Y-%m-%d %H:%M:%S")
             }
             
         except Exception as e:
             logger.error(f"Error extracting post data: {str(e)}")
             return None
 
-    def scrape_company_page(self, company_handle, company_info):
-        """Scrape posts from a company's LinkedIn page"""
+    def is_relevant(self, post_data):
+        """Whether an extracted post mentions any tracked keyword"""
+        return any(keyword.lower() in post_data['text'].lower() for keyword in self.KEYWORDS)
+
+    def make_post(self, post_data, company_handle, company_info):
+        """Build a LinkedInPost from extracted post data and company details"""
+        return LinkedInPost(
+            company=company_info['name'],
+            company_handle=company_handle,
+            sector=company_info['sector'],
+            **post_data
+        )
+
+    def process_posts(self, posts, company_handle, company_info, timestamp=None):
+        """Extract relevant posts from post container elements (live or archived).
+
+        ``timestamp`` is when an archived page was fetched.
+        """
+        posts_data = []
+        now = pd.Timestamp(timestamp).to_pydatetime() if timestamp is not None else None
+        
+        for post in posts:
+            try:
+                post_data = self.extract_post_data(post, now)
+                if post_data and self.is_relevant(post_data):
+                    posts_data.append(self.make_post(post_data, company_handle, company_info))
+            except Exception as e:
+                logger.error(f"Error processing post: {str(e)}")
+                continue
+        
+        return posts_data
+
+    def load_known_urns(self, data_dir='data'):
+        """URNs per company handle of every post harvested before, relevant or not"""
+        with SeenPostStore() as store:
+            known = store.known()
+        # Saved data from before the seen-post store existed
+        for path in find_source_files('linkedin', data_dir, latest_only=False):
+            try:
+                header = pd.read_csv(path, nrows=0).columns
+                if 'post_urn' not in header:
+                    continue
+                df = pd.read_csv(path, usecols=['company_handle', 'post_urn'], dtype='string').dropna()
+                for handle, urns in df.groupby('company_handle')['post_urn']:
+                    known.setdefault(handle, set()).update(urns)
+            except Exception as e:
+                logger.error(f"Error reading known posts from {path}: {str(e)}")
+        return known
+
+    def archive_page(self, company_handle, url, pruned=()):
+        """Keep the raw page so posts can be re-extracted later without re-scraping.
+
+        ``pruned`` holds the markup of post containers removed from the DOM
+        while scrolling; they go back into the archived copy.
+        """
+        try:
+            page = self.driver.page_source
+            if pruned:
+                end = page.rfind('</body>')
+                end = len(page) if end < 0 else end
+                page = page[:end] + ''.join(pruned) + page[end:]
+            self.archive.store(company_handle, url, page)
+        except Exception as e:
+            logger.error(f"Error archiving page for {company_handle}: {str(e)}")
+
+    def harvest_posts(self, company_handle, company_info, url, known_urns=frozenset(), cutoff=None,
+                      max_scrolls=5, prune=False):
+        """Extract posts as they appear, scrolling only until a round holds nothing new.
+
+        A round is stale when every post in it was harvested before or is
+        older than ``cutoff``; a single known post (e.g. a pinned one at the
+        top) does not stop the harvest. Returns the relevant posts and the
+        URNs of every post harvested.
+        """
+        container = self.SELECTORS['post_container']
+        seen = set()
+        posts_data = []
+        pruned = []
+        
+        for scroll in range(max_scrolls + 1):
+            # Only containers not handled in an earlier round
+            posts = self.driver.find_elements(By.CSS_SELECTOR, f"{container}:not([data-harvested])")
+            if not posts:
+                logger.info(f"No new posts after {scroll} scrolls for {company_handle}")
+                break
+            
+            stale = True
+            for post in posts:
+                try:
+                    post_data = self.extract_post_data(post)
+                    if not post_data:
+                        continue
+                    urn = post_data['post_urn']
+                    if urn and urn in seen:
+                        continue
+                    if urn:
+                        seen.add(urn)
+                    if urn in known_urns or (cutoff and post_data['posted_at'] and post_data['posted_at'] < cutoff):
+                        continue
+                    stale = False
+                    if self.is_relevant(post_data):
+                        posts_data.append(self.make_post(post_data, company_handle, company_info))
+                except Exception as e:
+                    logger.error(f"Error processing post: {str(e)}")
+                    continue
+            
+            if prune:
+                # Keep the handled nodes' markup for the archive before they leave the DOM
+                pruned.extend(self.driver.execute_script(
+                    "return arguments[0].map(e => { const html = e.outerHTML; e.remove(); return html; });",
+                    posts))
+            else:
+                self.driver.execute_script(
+                    "arguments[0].forEach(e => e.setAttribute('data-harvested', '1'));", posts)
+            
+            if stale:
+                logger.info(f"Only previously harvested or old posts after {scroll} scrolls for {company_handle}")
+                break
+            if scroll < max_scrolls:
+                self.scroll_page(scroll_count=1)
+        
+        # One archived copy per visit, holding every post harvested
+        self.archive_page(company_handle, url, pruned)
+        return posts_data, seen
+
+    def scrape_company_page(self, company_handle, company_info, known_urns=frozenset(), cutoff=None,
+                            max_scrolls=5, prune=False, raise_errors=False):
+        """Scrape new posts from a company's LinkedIn page.
+
+        Returns the relevant posts and the URNs of every post harvested.
+        """
         try:
             url = f"https://www.linkedin.com/company/{company_handle}/posts/"
             logger.info(f"Scraping company page: {company_handle}")
@@ -242,82 +415,116 @@ class LinkedInScraper:
                 self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, self.SELECTORS['post_container'])))
             except TimeoutException:
                 logger.warning(f"No posts found for {company_handle}")
-                return []
-            
-            self.scroll_page()
-            posts_data = []
+                return [], set()
             
-            # Find all posts
-            posts = self.driver.find_elements(By.CSS_SELECTOR, self.SELECTORS['post_container'])
-            
-            for post in posts:
-                try:
-                    post_data = self.extract_post_data(post)
-                    if post_data and any(keyword.lower() in post_data['text'].lower() for keyword in self.KEYWORDS):
-                        post_data.update({
-                            'company': company_info['name'],
-                            'company_handle': company_handle,
-                            'sector': company_info['sector']
-                        })
-                        posts_data.append(post_data)
-                except Exception as e:
-                    logger.error(f"Error processing post: {str(e)}")
-                    continue
+            posts_data, seen = self.harvest_posts(company_handle, company_info, url, known_urns, cutoff,
+                                                  max_scrolls, prune)
             
             logger.info(f"Collected {len(posts_data)} relevant posts from {company_handle}")
-            return posts_data
+            return posts_data, seen
             
         except Exception as e:
             logger.error(f"Error scraping company {company_handle}: {str(e)}")
-            return []
+            if raise_errors:
+                raise
+            return [], set()
+
+    def write_batch(self, batch, run_id=None, part=None):
+        """Write a LinkedInBatch to CSV (plus raw JSON) and return the CSV path.
+
+        Files are named by timestamp, or ``<run_id>__<part>`` for one part
+        (company) of a queued run, which the data loader reads as one run.
+        """
+        # Create data directory if it doesn't exist
+        os.makedirs('data', exist_ok=True)
+        
+        # Save to CSV
+        df = batch.to_dataframe()
+        df['clean_text'] = normalize_text(df['text'])
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        if run_id:
+            timestamp = re.sub(r'[^\w.-]+', '-', run_id) + RUN_SEPARATOR + part
+        filename = f'data/linkedin_posts_{timestamp}.csv'
+        
+        df.to_csv(filename, index=False)
+        logger.info(f"Successfully saved {len(df)} posts to {filename}")
+        update_rollups(df, 'linkedin', os.path.basename(filename))
+        update_search_index(df, 'linkedin', os.path.basename(filename))
+        
+        # Save raw data as backup
+        with open(f'data/linkedin_raw_{timestamp}.jsonl', 'w', encoding='utf-8') as f:
+            batch.write_json_lines(f)
+        logger.info(f"Saved raw data backup to data/linkedin_raw_{timestamp}.jsonl")
+        return filename
 
-    def save_data(self, all_posts):
-        """Save collected data with timestamp"""
+    def save_data(self, batch):
+        """Save a LinkedInBatch of collected posts with timestamp"""
         try:
-            if not all_posts:
+            if not len(batch):
                 logger.warning("No posts to save")
-                return
-                
-            # Create data directory if it doesn't exist
-            os.makedirs('data', exist_ok=True)
-            
-            # Save to CSV
-            df = pd.DataFrame(all_posts)
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f'data/linkedin_posts_{timestamp}.csv'
-            
-            df.to_csv(filename, index=False)
-            logger.info(f"Successfully saved {len(df)} posts to {filename}")
-            
-            # Save raw data as backup
-            with open(f'data/linkedin_raw_{timestamp}.json', 'w', encoding='utf-8') as f:
-                json.dump(all_posts, f, ensure_ascii=False, indent=2)
-            logger.info(f"Saved raw data backup to data/linkedin_raw_{timestamp}.json")
-            
+                return None
+            return self.write_batch(batch)
         except Exception as e:
             logger.error(f"Error saving data: {str(e)}")
+            return None
+
+    def scrape_job(self, job, known, cutoff, prune=False):
+        """Scrape one queued company and save its posts; returns the CSV path (None if no new posts)"""
+        handle = job.key
+        posts, seen = self.scrape_company_page(handle, job.payload, known.get(handle, frozenset()), cutoff,
+                                               prune=prune, raise_errors=True)
+        batch = LinkedInBatch()
+        batch.extend(posts)
+        result = self.write_batch(batch, run_id=job.run_id, part=handle) if len(batch) else None
+        
+        # Only mark posts as harvested once their data is saved, so a retried job sees them again
+        with SeenPostStore() as store:
+            store.add(handle, seen)
+        known.setdefault(handle, set()).update(seen)
+        
+        # Random delay between companies
+        time.sleep(random.uniform(20, 30))
+        return result
 
-    def run(self):
-        """Main execution method"""
+    def report_run(self, queue, run_id):
+        """Log how many companies of a run finished and which failed for good"""
+        counts = queue.counts(run_id)
+        logger.info(f"Run {run_id}: {counts[DONE]} companies finished, {counts[FAILED]} failed")
+        if counts[FAILED]:
+            jobs = queue.jobs(run_id)
+            failed = jobs[jobs['status'] == FAILED]
+            for row in failed.itertuples():
+                logger.error(f"Company {row.job_key} failed after {row.attempts} attempts: {row.last_error}")
+            logger.error(f"Requeue failed companies with: python scrape_queue.py --run {run_id} retry-failed")
+
+    def run(self, max_age_days=30, prune=False, run_id=None, queue_path=QUEUE_DB):
+        """Main execution method.
+
+        Every company page is a job in a durable queue. Each call starts a
+        new run unless ``run_id`` names an earlier one to resume, in which
+        case companies already done are skipped; several scrapers can share
+        a run by passing the same id.
+        """
+        run_id = run_id or datetime.now().strftime('%Y%m%d_%H%M%S')
+        queue = JobQueue(queue_path)
         try:
+            queue.enqueue(run_id, self.COMPANY_PAGES.items())
+            if queue.next_available(run_id) is None:
+                logger.info(f"Nothing left to scrape in run {run_id}")
+                self.report_run(queue, run_id)
+                return
+            logger.info(f"Scraping run {run_id}")
             self.login()
-            all_posts = []
-            
-            for handle, info in self.COMPANY_PAGES.items():
-                try:
-                    posts = self.scrape_company_page(handle, info)
-                    all_posts.extend(posts)
-                    # Random delay between companies
-                    time.sleep(random.uniform(20, 30))
-                except Exception as e:
-                    logger.error(f"Error processing company {handle}: {str(e)}")
-                    continue
+            known = self.load_known_urns()
+            cutoff = datetime.now() - timedelta(days=max_age_days) if max_age_days else None
             
-            self.save_data(all_posts)
+            work(queue, run_id, lambda job: self.scrape_job(job, known, cutoff, prune))
+            self.report_run(queue, run_id)
             
         except Exception as e:
             logger.error(f"Error in main execution: {str(e)}")
         finally:
+            queue.close()
             self.driver.quit()
 
 if __name__ == "__main__":
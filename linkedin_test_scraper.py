@@ -15,6 +15,7 @@ from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service as ChromeService
 from webdriver_manager.chrome import ChromeDriverManager
+from page_archive import PageArchive, DEBUG
 
 # Set up logging
 logging.basicConfig(
@@ -242,10 +243,10 @@ class LinkedInTestScraper:
             
             if not found_elements:
                 logger.warning("No elements found with any selector")
-                # Save page source for debugging
-                with open('linkedin_page.html', 'w', encoding='utf-8') as f:
-                    f.write(self.driver.page_source)
-                logger.info("Saved page source to linkedin_page.html")
+                # Archive page source for debugging; re-parsing skips debug pages
+                with PageArchive() as archive:
+                    digest = archive.store('safaricom', self.COMPANY_URL, self.driver.page_source, kind=DEBUG)
+                logger.info(f"Archived page source as {digest}")
                 return []
             
             # Try to get any text content
@@ -275,10 +276,10 @@ class LinkedInTestScraper:
             
         except Exception as e:
             logger.error(f"Error scraping posts: {str(e)}")
-            # Save page source for debugging
-            with open('linkedin_error_page.html', 'w', encoding='utf-8') as f:
-                f.write(self.driver.page_source)
-            logger.info("Saved error page source to linkedin_error_page.html")
+            # Archive page source for debugging; re-parsing skips debug pages
+            with PageArchive() as archive:
+                digest = archive.store('safaricom', self.COMPANY_URL, self.driver.page_source, kind=DEBUG)
+            logger.info(f"Archived error page source as {digest}")
             return []
 
     def save_data(self, posts_data):
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+AI Conversation in Kenya - Raw Page Archive
+Keeps the page_source of every visited LinkedIn page, zstd-compressed and
+de-duplicated by content hash, indexed by company handle and fetch time, so
+selectors can be fixed and posts re-extracted locally without re-scraping.
+"""
+
+import os
+import sys
+import sqlite3
+import hashlib
+import logging
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import zstandard
+from bs4 import BeautifulSoup
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'page_archive')
+COMPRESSION_LEVEL = 10
+
+# Page kinds: company post pages are re-parsed; debug pages (login walls,
+# failed loads) are only kept for inspection
+POSTS = 'posts'
+DEBUG = 'debug'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    company_handle TEXT,
+    url TEXT NOT NULL,
+    fetched_at TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    kind TEXT NOT NULL DEFAULT 'posts'
+);
+CREATE INDEX IF NOT EXISTS idx_pages_company ON pages (company_handle, fetched_at);
+CREATE INDEX IF NOT EXISTS idx_pages_fetched ON pages (fetched_at);
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    compressed_size INTEGER NOT NULL
+);
+"""
+
+
+class PageArchive:
+    """Content-addressed store of compressed page sources"""
+
+    def __init__(self, root=ARCHIVE_DIR):
+        self.root = root
+        os.makedirs(os.path.join(root, 'objects'), exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(root, 'index.db'))
+        self.conn.executescript(SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(pages)")}
+        if 'kind' not in columns:
+            # Archives from before page kinds existed only held post pages
+            with self.conn:
+                self.conn.execute(f"ALTER TABLE pages ADD COLUMN kind TEXT NOT NULL DEFAULT '{POSTS}'")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _blob_path(self, digest):
+        return os.path.join(self.root, 'objects', digest[:2], f'{digest}.html.zst')
+
+    def store(self, company_handle, url, page_source, fetched_at=None, kind=POSTS):
+        """Archive one page visit; identical content is stored only once. Returns the hash.
+
+        Pages that are not a company's post feed (login walls, error pages
+        kept for debugging) are stored with ``kind=DEBUG`` so re-parsing
+        skips them.
+        """
+        raw = page_source.encode('utf-8')
+        digest = hashlib.sha256(raw).hexdigest()
+        fetched_at = (fetched_at or datetime.now()).strftime('%Y-%m-%dT%H:%M:%S')
+
+        with self.conn:
+            known = self.conn.execute("SELECT 1 FROM blobs WHERE sha256 = ?", (digest,)).fetchone()
+            if known is None:
+                path = self._blob_path(digest)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                compressed = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL).compress(raw)
+                with open(path + '.tmp', 'wb') as f:
+                    f.write(compressed)
+                os.replace(path + '.tmp', path)
+                self.conn.execute("INSERT INTO blobs VALUES (?, ?, ?)", (digest, len(raw), len(compressed)))
+            self.conn.execute(
+                "INSERT INTO pages (company_handle, url, fetched_at, sha256, kind) VALUES (?, ?, ?, ?, ?)",
+                (company_handle, url, fetched_at, digest, kind))
+        return digest
+
+    def read(self, digest):
+        """Return the decompressed page source for a content hash"""
+        with open(self._blob_path(digest), 'rb') as f:
+            return zstandard.ZstdDecompressor().decompress(f.read()).decode('utf-8')
+
+    def pages(self, company_handle=None, since=None, until=None, latest_only=False, kind=POSTS):
+        """Index rows (company_handle, url, fetched_at, sha256) matching the filters.
+
+        Only post pages by default; ``kind=None`` includes debug pages too.
+        """
+        sql = ["SELECT company_handle, url, fetched_at, sha256 FROM pages WHERE 1 = 1"]
+        params = []
+        if kind is not None:
+            sql.append("AND kind = ?")
+            params.append(kind)
+        if company_handle is not None:
+            sql.append("AND company_handle = ?")
+            params.append(company_handle)
+        if since is not None:
+            sql.append("AND fetched_at >= ?")
+            params.append(pd.Timestamp(since).strftime('%Y-%m-%dT%H:%M:%S'))
+        if until is not None:
+            sql.append("AND fetched_at < ?")
+            params.append(pd.Timestamp(until).strftime('%Y-%m-%dT%H:%M:%S'))
+        sql.append("ORDER BY company_handle, fetched_at")
+
+        df = pd.read_sql_query(' '.join(sql), self.conn, params=params)
+        if latest_only:
+            df = df.groupby('company_handle', dropna=False).tail(1)
+        return df.reset_index(drop=True)
+
+    def stats(self):
+        visits, blobs, size, compressed = self.conn.execute(
+            "SELECT (SELECT COUNT(*) FROM pages), COUNT(*), COALESCE(SUM(size), 0), "
+            "COALESCE(SUM(compressed_size), 0) FROM blobs").fetchone()
+        return {'visits': visits, 'unique_pages': blobs, 'bytes': size, 'compressed_bytes': compressed}
+
+
+class SoupElement:
+    """Minimal WebElement look-alike over parsed HTML.
+
+    Lets LinkedInScraper.extract_post_data run unchanged on archived pages.
+    """
+
+    def __init__(self, tag):
+        self.tag = tag
+
+    @property
+    def text(self):
+        return self.tag.get_text('\n', strip=True)
+
+    def get_attribute(self, name):
+        if name == 'outerHTML':
+            return str(self.tag)
+        value = self.tag.get(name)
+        return ' '.join(value) if isinstance(value, list) else value
+
+    @staticmethod
+    def _css(by, value):
+        """CSS selector for a Selenium locator; XPath and link-text locators are not supported"""
+        if by == By.CSS_SELECTOR:
+            return value
+        if by == By.TAG_NAME:
+            return value
+        if by == By.CLASS_NAME:
+            return '.' + value
+        if by == By.ID:
+            return '[id="{}"]'.format(value.replace('"', '\\"'))
+        if by == By.NAME:
+            return '[name="{}"]'.format(value.replace('"', '\\"'))
+        raise NotImplementedError(f"Locator {by!r} is not supported on archived pages")
+
+    def find_element(self, by, value):
+        found = self.tag.select_one(self._css(by, value))
+        if found is None:
+            raise NoSuchElementException(f"No element matches {by} {value}")
+        return SoupElement(found)
+
+    def find_elements(self, by, value):
+        return [SoupElement(found) for found in self.tag.select(self._css(by, value))]
+
+
+_worker = {}
+
+
+def _init_worker(root):
+    from linkedin_scraper import LinkedInScraper
+
+    _worker['archive'] = PageArchive(root)
+    _worker['scraper'] = LinkedInScraper(start_driver=False)
+
+
+def _reparse_page(page):
+    """Run the scraper's current extraction over one archived page"""
+    archive, scraper = _worker['archive'], _worker['scraper']
+    handle = page['company_handle']
+    company_info = scraper.COMPANY_PAGES.get(handle, {'name': handle, 'sector': None})
+
+    document = SoupElement(BeautifulSoup(archive.read(page['sha256']), 'html.parser'))
+    posts = document.find_elements(By.CSS_SELECTOR, scraper.SELECTORS['post_container'])
+    return scraper.process_posts(posts, handle, company_info, timestamp=page['fetched_at'])
+
+
+def _post_key(post):
+    """Identity of a post across page visits: its URN, else company and text"""
+    return post.post_urn or (post.company_handle, post.text)
+
+
+def reparse(archive_root=ARCHIVE_DIR, company_handle=None, since=None, until=None,
+            latest_only=False, workers=None):
+    """Re-extract posts from archived pages in parallel; returns a LinkedInBatch.
+
+    Successive visits to a company page show mostly the same posts, so each
+    post appears once, taken from the most recent page it was seen on.
+    """
+    from records import LinkedInBatch
+
+    with PageArchive(archive_root) as archive:
+        pages = archive.pages(company_handle, since, until, latest_only)
+    # Identical page content yields identical posts; parse each version once
+    pages = pages.drop_duplicates(['company_handle', 'sha256']).to_dict('records')
+    logger.info(f"Re-parsing {len(pages)} archived pages")
+
+    # Pages come in fetch order per company, so later visits overwrite earlier ones
+    latest = {}
+    extracted = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(archive_root,)) as pool:
+        for posts in pool.map(_reparse_page, pages, chunksize=8):
+            extracted += len(posts)
+            latest.update((_post_key(post), post) for post in posts)
+
+    batch = LinkedInBatch()
+    batch.extend(latest.values())
+    logger.info(f"Re-extracted {len(batch)} unique relevant posts ({extracted} before de-duplication)")
+    return batch
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Archived LinkedIn pages')
+    parser.add_argument('--root', default=ARCHIVE_DIR, help='archive directory')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    sub.add_parser('stats', help='show archive size and de-duplication')
+
+    run = sub.add_parser('reparse', help='re-extract posts from archived pages and save them')
+    run.add_argument('--company', help='only this company handle')
+    run.add_argument('--since', help='fetched at or after this date')
+    run.add_argument('--until', help='fetched before this date')
+    run.add_argument('--latest-only', action='store_true', help='only the newest page per company')
+    run.add_argument('--workers', type=int, help='parser processes (default: CPU count)')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'stats':
+        with PageArchive(args.root) as archive:
+            stats = archive.stats()
+        ratio = stats['bytes'] / stats['compressed_bytes'] if stats['compressed_bytes'] else 0
+        print(f"{stats['visits']} visits, {stats['unique_pages']} unique pages, "
+              f"{stats['bytes']} bytes -> {stats['compressed_bytes']} compressed ({ratio:.1f}x)")
+        return
+
+    from linkedin_scraper import LinkedInScraper
+
+    batch = reparse(args.root, args.company, args.since, args.until, args.latest_only, args.workers)
+    LinkedInScraper(start_driver=False).save_data(batch)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    sys.exit(main())
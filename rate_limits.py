@@ -0,0 +1,256 @@
+"""
+Rate-limit-aware request scheduler for the Twitter API.
+
+Instead of letting tweepy sleep the whole process when one endpoint runs out
+of requests (``wait_on_rate_limit=True``), the scheduler tracks a budget per
+endpoint from the ``x-rate-limit-*`` response headers and keeps dispatching
+queued work for endpoints that still have budget while the others cool down.
+"""
+
+import re
+import time
+import logging
+import itertools
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Canonical endpoint keys (URL paths with ids replaced by :id)
+SEARCH_RECENT = '/2/tweets/search/recent'
+TWEET_LOOKUP = '/2/tweets'
+TWEET_BY_ID = '/2/tweets/:id'
+USER_LOOKUP = '/2/users'
+USER_BY_ID = '/2/users/:id'
+
+
+def endpoint_for_url(url):
+    """Map a request URL to its endpoint key, e.g. /2/tweets/123 -> /2/tweets/:id"""
+    path = urlparse(url).path.rstrip('/')
+    # Leave the leading API version segment (/2) alone
+    return re.sub(r'(?<=.)/\d+(?=/|$)', '/:id', path)
+
+
+class EndpointBudget:
+    """Remaining requests for one endpoint in the current rate-limit window"""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.limit = None
+        self.remaining = None
+        self.reset_at = None
+
+    def update(self, headers):
+        headers = {key.lower(): value for key, value in headers.items()}
+        try:
+            if 'x-rate-limit-limit' in headers:
+                self.limit = int(headers['x-rate-limit-limit'])
+            if 'x-rate-limit-remaining' in headers:
+                self.remaining = int(headers['x-rate-limit-remaining'])
+            if 'x-rate-limit-reset' in headers:
+                self.reset_at = float(headers['x-rate-limit-reset'])
+        except ValueError:
+            logger.warning(f"Ignoring malformed rate-limit headers for {self.endpoint}: {headers}")
+
+    def exhaust(self, now, fallback_wait):
+        """Mark the budget as used up after a 429, even without headers"""
+        self.remaining = 0
+        if self.reset_at is None or self.reset_at <= now:
+            self.reset_at = now + fallback_wait
+
+    def wait_time(self, now):
+        """Seconds until a request can be sent (0 when budget is available)"""
+        if self.reset_at is not None and now >= self.reset_at:
+            # A new window has started
+            self.remaining = self.limit
+            self.reset_at = None
+        if self.remaining is None or self.remaining > 0:
+            return 0.0
+        return max(0.0, self.reset_at - now) if self.reset_at is not None else 0.0
+
+    def consume(self):
+        if self.remaining is not None and self.remaining > 0:
+            self.remaining -= 1
+
+
+class Job:
+    """One queued API call"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, endpoint, func, args, kwargs, on_result=None):
+        self.id = next(self._ids)
+        self.endpoint = endpoint
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.on_result = on_result
+        self.attempts = 0
+        self.result = None
+        self.error = None
+
+
+class RateLimitScheduler:
+    """Interleave queued API calls across endpoints within their rate budgets.
+
+    ``clock`` and ``sleep`` are injectable so the scheduler can be driven by a
+    fake clock (or a stub server) in tests.
+    """
+
+    def __init__(self, max_retries=3, fallback_wait=60.0, clock=time.time, sleep=time.sleep):
+        self.max_retries = max_retries
+        self.fallback_wait = fallback_wait
+        self.clock = clock
+        self.sleep = sleep
+        self.budgets = {}
+        self.queues = OrderedDict()
+
+    def budget(self, endpoint):
+        if endpoint not in self.budgets:
+            self.budgets[endpoint] = EndpointBudget(endpoint)
+        return self.budgets[endpoint]
+
+    def _record_headers(self, response, *args, **kwargs):
+        self.update_from_headers(response.url, response.headers)
+        return response
+
+    def attach(self, client):
+        """Read rate-limit headers from every response of a tweepy.Client session"""
+        client.session.hooks.setdefault('response', []).append(self._record_headers)
+        return self
+
+    def detach(self, client):
+        """Stop reading headers from a client attached earlier"""
+        hooks = client.session.hooks.get('response', [])
+        if self._record_headers in hooks:
+            hooks.remove(self._record_headers)
+
+    def update_from_headers(self, endpoint, headers):
+        """Update the budget of an endpoint key, path or URL from rate-limit headers"""
+        self.budget(endpoint_for_url(endpoint)).update(headers)
+
+    def expected_wait(self, endpoint=None):
+        """Seconds until ``endpoint`` (or, by default, any queued endpoint) can send again"""
+        now = self.clock()
+        if endpoint is not None:
+            return self.budget(endpoint_for_url(endpoint)).wait_time(now)
+        pending = [name for name, queue in self.queues.items() if queue]
+        if not pending:
+            return 0.0
+        return min(self.budget(name).wait_time(now) for name in pending)
+
+    def submit(self, endpoint, func, *args, on_result=None, **kwargs):
+        """Queue ``func(*args, **kwargs)`` against ``endpoint``; returns the Job.
+
+        ``endpoint`` is an endpoint key such as USER_BY_ID or the path or URL
+        the call requests; either way it is normalized like response URLs, so
+        the job waits on the budget its responses report.
+        """
+        endpoint = endpoint_for_url(endpoint)
+        job = Job(endpoint, func, args, kwargs, on_result)
+        self.queues.setdefault(endpoint, deque()).append(job)
+        return job
+
+    def pending(self):
+        return sum(len(queue) for queue in self.queues.values())
+
+    def _rate_limit_headers(self, error):
+        """Return response headers if ``error`` is a 429, otherwise None"""
+        response = getattr(error, 'response', None)
+        if response is not None and getattr(response, 'status_code', None) == 429:
+            return dict(response.headers)
+        return None
+
+    def _execute(self, job):
+        """Run one job's call; safe to use from worker threads"""
+        job.attempts += 1
+        try:
+            job.result = job.func(*job.args, **job.kwargs)
+            job.error = None
+        except Exception as e:
+            job.error = e
+        return job
+
+    def _settle(self, job):
+        """Handle a finished call: requeue on 429, otherwise report it. Returns True when done"""
+        if job.error is None:
+            if job.on_result is not None:
+                # A failing handler must not abort the run and drop the remaining jobs
+                try:
+                    job.on_result(job.result)
+                except Exception as e:
+                    job.error = e
+                    logger.error(f"Result handler for job {job.id} on {job.endpoint} failed: {str(e)}")
+            return True
+
+        headers = self._rate_limit_headers(job.error)
+        if headers is None:
+            logger.error(f"Job {job.id} on {job.endpoint} failed: {str(job.error)}")
+            return True
+
+        now = self.clock()
+        budget = self.budget(job.endpoint)
+        budget.update(headers)
+        budget.exhaust(now, self.fallback_wait)
+        if job.attempts > self.max_retries:
+            logger.error(f"Job {job.id} on {job.endpoint} still rate limited after {job.attempts} attempts")
+            return True
+
+        logger.warning(f"Rate limited on {job.endpoint}; cooling down for "
+                       f"{budget.wait_time(now):.0f}s while other endpoints continue")
+        job.error = None
+        self.queues[job.endpoint].appendleft(job)
+        return False
+
+    def _take_ready(self, limit, per_endpoint=None):
+        """Pop up to ``limit`` jobs, round-robin across endpoints that still have budget"""
+        now = self.clock()
+        allowance = {}
+        for endpoint, queue in self.queues.items():
+            budget = self.budget(endpoint)
+            if queue and budget.wait_time(now) == 0:
+                allowance[endpoint] = len(queue) if budget.remaining is None else min(len(queue), budget.remaining)
+                if per_endpoint is not None:
+                    allowance[endpoint] = min(allowance[endpoint], per_endpoint)
+
+        jobs = []
+        while len(jobs) < limit and any(allowance.values()):
+            for endpoint in allowance:
+                if allowance[endpoint] and len(jobs) < limit:
+                    jobs.append(self.queues[endpoint].popleft())
+                    self.budget(endpoint).consume()
+                    allowance[endpoint] -= 1
+        return jobs
+
+    def run(self, workers=1):
+        """Process every queued job, returning them in completion order.
+
+        With ``workers`` > 1, up to that many calls (bounded by each endpoint's
+        remaining budget) run concurrently per pass. Result callbacks always
+        run on the calling thread.
+        """
+        completed = []
+        pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            while self.pending():
+                # Without a parallel pool, one job per ready endpoint per pass keeps work interleaved
+                if pool is None:
+                    jobs = self._take_ready(len(self.queues), per_endpoint=1)
+                else:
+                    jobs = self._take_ready(workers)
+                if not jobs:
+                    wait = self.expected_wait()
+                    logger.info(f"All pending endpoints cooling down; next request in {wait:.0f}s")
+                    self.sleep(max(wait, 0.1))
+                    continue
+
+                if pool is None:
+                    finished = [self._execute(job) for job in jobs]
+                else:
+                    finished = list(pool.map(self._execute, jobs))
+                completed.extend(job for job in finished if self._settle(job))
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        return completed
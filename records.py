@@ -0,0 +1,247 @@
+"""
+Typed record layer for collected posts.
+
+Collectors append compact ``__slots__`` records into a columnar batch instead of
+building one dict per post. Repeated strings (search query, company, sector)
+are interned and stored as integer codes, numbers live in typed arrays, and the
+batch hands its buffers to pandas without copying them again.
+"""
+
+import sys
+import json
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+# Column kinds understood by RecordBatch
+CATEGORY = 'category'
+STRING = 'string'
+INT = 'int'
+BOOL = 'bool'
+DATETIME = 'datetime'
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+@dataclass
+class TweetRecord:
+    """A single tweet as parsed from a search response"""
+    __slots__ = ('tweet_id', 'created_at', 'text', 'username', 'user_followers', 'user_verified',
+                 'retweet_count', 'like_count', 'reply_count', 'quote_count', 'query')
+    tweet_id: str
+    created_at: datetime
+    text: str
+    username: str
+    user_followers: int
+    user_verified: bool
+    retweet_count: int
+    like_count: int
+    reply_count: int
+    quote_count: int
+    query: str
+
+
+@dataclass
+class LinkedInPost:
+    """A single company post as returned by LinkedInScraper.scrape_company_page"""
+    __slots__ = ('post_urn', 'posted_at', 'text', 'author_name', 'author_title', 'likes', 'comments',
+                 'shares', 'timestamp', 'company', 'company_handle', 'sector')
+    post_urn: str
+    posted_at: datetime
+    text: str
+    author_name: str
+    author_title: str
+    likes: int
+    comments: int
+    shares: int
+    timestamp: datetime
+    company: str
+    company_handle: str
+    sector: str
+
+
+TWEET_SCHEMA = {
+    'tweet_id': STRING,
+    'created_at': DATETIME,
+    'text': STRING,
+    'username': STRING,
+    'user_followers': INT,
+    'user_verified': BOOL,
+    'retweet_count': INT,
+    'like_count': INT,
+    'reply_count': INT,
+    'quote_count': INT,
+    'query': CATEGORY,
+}
+
+LINKEDIN_SCHEMA = {
+    'post_urn': STRING,
+    'posted_at': DATETIME,
+    'text': STRING,
+    'author_name': STRING,
+    'author_title': STRING,
+    'likes': INT,
+    'comments': INT,
+    'shares': INT,
+    'timestamp': DATETIME,
+    'company': CATEGORY,
+    'company_handle': CATEGORY,
+    'sector': CATEGORY,
+}
+
+
+def _to_epoch_ns(value):
+    """Convert a datetime (naive values are treated as local time) to epoch nanoseconds"""
+    if value.tzinfo is None:
+        value = value.astimezone()
+    delta = value - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 10**9 + delta.microseconds * 1000
+
+
+class RecordBatch:
+    """Columnar accumulator for typed records.
+
+    Each column is kept in the cheapest container for its kind: ``array('q')``
+    for integers and timestamps, ``array('b')`` for booleans, ``array('i')``
+    codes plus a shared dictionary of interned values for categories, and a
+    plain list for free text. ``None`` values are tracked in a parallel mask.
+
+    Once ``to_dataframe`` has been called the numeric buffers are shared with
+    pandas, so the batch is frozen and further appends raise ``RuntimeError``.
+    """
+
+    def __init__(self, schema):
+        self.schema = dict(schema)
+        self._columns = {}
+        self._masks = {}
+        self._categories = {}
+        for name, kind in self.schema.items():
+            if kind in (INT, DATETIME):
+                self._columns[name] = array('q')
+            elif kind == BOOL:
+                self._columns[name] = array('b')
+            elif kind == CATEGORY:
+                self._columns[name] = array('i')
+                self._categories[name] = {}
+            else:
+                self._columns[name] = []
+            if kind in (INT, BOOL, DATETIME):
+                self._masks[name] = array('b')
+        self._length = 0
+        self._frozen = False
+
+    def __len__(self):
+        return self._length
+
+    def append(self, record):
+        """Append a record whose attributes match the batch schema"""
+        if self._frozen:
+            raise RuntimeError("RecordBatch is frozen after conversion to a DataFrame")
+
+        for name, kind in self.schema.items():
+            value = getattr(record, name)
+            column = self._columns[name]
+
+            if kind == CATEGORY:
+                lookup = self._categories[name]
+                if value is None:
+                    column.append(-1)
+                else:
+                    code = lookup.get(value)
+                    if code is None:
+                        code = lookup[sys.intern(value)] = len(lookup)
+                    column.append(code)
+            elif kind == STRING:
+                column.append(value)
+            else:
+                missing = value is None
+                self._masks[name].append(missing)
+                if missing:
+                    column.append(0)
+                elif kind == DATETIME:
+                    if isinstance(value, str):
+                        value = datetime.fromisoformat(value)
+                    column.append(_to_epoch_ns(value))
+                else:
+                    column.append(int(value))
+
+        self._length += 1
+
+    def extend(self, records):
+        """Append every record from an iterable"""
+        for record in records:
+            self.append(record)
+
+    def categories(self, name):
+        """Return the distinct values seen for a categorical column, in code order"""
+        return list(self._categories[name])
+
+    def _column_array(self, name, kind):
+        column = self._columns[name]
+
+        if kind == CATEGORY:
+            codes = np.frombuffer(column, dtype=np.int32) if len(column) else np.empty(0, np.int32)
+            return pd.Categorical.from_codes(codes, categories=self.categories(name))
+        if kind == STRING:
+            return pd.array(column, dtype='string')
+
+        mask = np.frombuffer(self._masks[name], dtype=np.bool_) if len(column) else np.empty(0, np.bool_)
+        if kind == INT:
+            values = np.frombuffer(column, dtype=np.int64) if len(column) else np.empty(0, np.int64)
+            return pd.arrays.IntegerArray(values, mask)
+        if kind == BOOL:
+            values = np.frombuffer(column, dtype=np.bool_) if len(column) else np.empty(0, np.bool_)
+            return pd.arrays.BooleanArray(values, mask)
+
+        values = np.frombuffer(column, dtype='datetime64[ns]') if len(column) else np.empty(0, 'datetime64[ns]')
+        if mask.any():
+            values = np.where(mask, np.datetime64('NaT'), values)
+        return pd.DatetimeIndex(values).tz_localize('UTC')
+
+    def to_dataframe(self):
+        """Build a DataFrame that shares the batch's numeric buffers"""
+        self._frozen = True
+        data = {name: self._column_array(name, kind) for name, kind in self.schema.items()}
+        return pd.DataFrame(data, copy=False)
+
+    def to_records(self):
+        """Yield plain dicts, with ISO timestamps, one row at a time"""
+        lookups = {name: self.categories(name) for name in self._categories}
+
+        for i in range(self._length):
+            row = {}
+            for name, kind in self.schema.items():
+                value = self._columns[name][i]
+                if kind == CATEGORY:
+                    value = lookups[name][value] if value >= 0 else None
+                elif name in self._masks and self._masks[name][i]:
+                    value = None
+                elif kind == DATETIME:
+                    value = pd.Timestamp(value, unit='ns', tz='UTC').isoformat()
+                elif kind == BOOL:
+                    value = bool(value)
+                row[name] = value
+            yield row
+
+    def write_json_lines(self, f):
+        """Stream the batch to a text file as JSON Lines, one object per record"""
+        for row in self.to_records():
+            f.write(json.dumps(row, ensure_ascii=False))
+            f.write('\n')
+
+
+class TweetBatch(RecordBatch):
+    """RecordBatch preconfigured for TweetRecord"""
+
+    def __init__(self):
+        super().__init__(TWEET_SCHEMA)
+
+
+class LinkedInBatch(RecordBatch):
+    """RecordBatch preconfigured for LinkedInPost"""
+
+    def __init__(self):
+        super().__init__(LINKEDIN_SCHEMA)
@@ -0,0 +1,238 @@
+"""
+Record/replay cache for Twitter API responses.
+
+``CachingSession`` replaces the ``requests.Session`` inside a ``tweepy.Client``
+and stores raw v2 response bodies on disk (gzip-compressed), keyed by endpoint,
+request parameters and time window. Modes:
+
+- ``record``: always fetch from the API and store the response
+- ``replay``: never touch the network; serve the latest stored response
+- ``passthrough``: no caching at all
+
+A cache and its session are single-threaded: the SQLite index connection
+may only be used from the thread that opened it. Calls made from worker
+threads should go through a client without the cache (see
+``bypass_response_cache``).
+"""
+
+import os
+import copy
+import gzip
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+
+import requests
+
+from rate_limits import endpoint_for_url
+
+logger = logging.getLogger(__name__)
+
+RECORD = 'record'
+REPLAY = 'replay'
+PASSTHROUGH = 'passthrough'
+MODES = (RECORD, REPLAY, PASSTHROUGH)
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'response_cache')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    request_key TEXT NOT NULL,
+    window_start INTEGER NOT NULL,
+    endpoint TEXT NOT NULL,
+    params TEXT NOT NULL,
+    path TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (request_key, window_start)
+);
+CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at);
+"""
+
+# Headers worth keeping with a cached body
+KEPT_HEADERS = ('content-type', 'x-rate-limit-limit', 'x-rate-limit-remaining', 'x-rate-limit-reset')
+
+
+class CacheMiss(Exception):
+    """Raised in replay mode when no stored response matches a request"""
+
+
+class ResponseCache:
+    """On-disk store of compressed response bodies with a SQLite index.
+
+    Not thread-safe: use it only from the thread that created it.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, ttl=24 * 3600, window=3600, max_bytes=500 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.window = window
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(cache_dir, 'index.db'))
+        self.conn.executescript(SCHEMA)
+
+    @staticmethod
+    def request_key(method, endpoint, params):
+        """Stable key for a request, independent of parameter order"""
+        canonical = json.dumps([method.upper(), endpoint, params], sort_keys=True, default=str)
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def window_start(self, now=None):
+        now = time.time() if now is None else now
+        return int(now // self.window * self.window)
+
+    def get(self, request_key, window_start=None, fresh_only=True):
+        """Return ``(status, headers, body)`` for the newest matching entry, or None"""
+        sql = "SELECT window_start, path, status, headers, created_at FROM responses WHERE request_key = ?"
+        params = [request_key]
+        if window_start is not None:
+            sql += " AND window_start = ?"
+            params.append(window_start)
+        row = self.conn.execute(sql + " ORDER BY window_start DESC LIMIT 1", params).fetchone()
+        if row is None:
+            return None
+
+        stored_window, path, status, headers, created_at = row
+        if fresh_only and time.time() - created_at > self.ttl:
+            return None
+        try:
+            with gzip.open(os.path.join(self.cache_dir, path), 'rb') as f:
+                body = f.read()
+        except OSError:
+            self._delete(request_key, stored_window, path)
+            return None
+
+        with self.conn:
+            self.conn.execute("UPDATE responses SET accessed_at = ? WHERE request_key = ? AND window_start = ?",
+                              (time.time(), request_key, stored_window))
+        return status, json.loads(headers), body
+
+    def put(self, request_key, endpoint, params, status, headers, body, window_start=None):
+        window_start = self.window_start() if window_start is None else window_start
+        path = os.path.join(request_key[:2], f'{request_key}_{window_start}.json.gz')
+        full_path = os.path.join(self.cache_dir, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with gzip.open(full_path, 'wb') as f:
+            f.write(body)
+
+        now = time.time()
+        kept = {key: value for key, value in headers.items() if key.lower() in KEPT_HEADERS}
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (request_key, window_start, endpoint, json.dumps(params, sort_keys=True, default=str),
+                 path, status, json.dumps(kept), os.path.getsize(full_path), now, now))
+        self.evict()
+
+    def _delete(self, request_key, window_start, path):
+        try:
+            os.remove(os.path.join(self.cache_dir, path))
+        except OSError:
+            pass
+        with self.conn:
+            self.conn.execute("DELETE FROM responses WHERE request_key = ? AND window_start = ?",
+                              (request_key, window_start))
+
+    def evict(self, now=None):
+        """Drop expired entries, then least recently used ones until under ``max_bytes``"""
+        now = time.time() if now is None else now
+        expired = self.conn.execute("SELECT request_key, window_start, path FROM responses WHERE created_at < ?",
+                                    (now - self.ttl,)).fetchall()
+        for row in expired:
+            self._delete(*row)
+
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return len(expired)
+
+        evicted = len(expired)
+        for request_key, window_start, path, size in self.conn.execute(
+                "SELECT request_key, window_start, path, size FROM responses ORDER BY accessed_at").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._delete(request_key, window_start, path)
+            total -= size
+            evicted += 1
+        return evicted
+
+    def close(self):
+        self.conn.close()
+
+
+class CachingSession(requests.Session):
+    """requests.Session that records and replays GET responses through a ResponseCache.
+
+    Shares the cache's single-thread restriction in record and replay modes.
+    """
+
+    def __init__(self, cache, mode=RECORD):
+        super().__init__()
+        if mode not in MODES:
+            raise ValueError(f"Unknown cache mode {mode!r}; expected one of {MODES}")
+        self.cache = cache
+        self.mode = mode
+
+    def _build_response(self, url, status, headers, body):
+        response = requests.Response()
+        response.status_code = status
+        response.headers.update(headers)
+        response._content = body
+        response.url = url
+        response.encoding = 'utf-8'
+        response.from_cache = True
+        return response
+
+    def request(self, method, url, params=None, **kwargs):
+        if self.mode == PASSTHROUGH or method.upper() != 'GET':
+            return super().request(method, url, params=params, **kwargs)
+
+        endpoint = endpoint_for_url(url)
+        key = self.cache.request_key(method, url.split('?')[0], params or {})
+
+        if self.mode == REPLAY:
+            hit = self.cache.get(key, fresh_only=False)
+            if hit is None:
+                raise CacheMiss(f"No recorded response for GET {endpoint} with params {params}")
+            return self._build_response(url, *hit)
+
+        # Recording never serves stored responses, so re-runs always see fresh data
+        response = super().request(method, url, params=params, **kwargs)
+        if response.status_code == 200:
+            self.cache.put(key, endpoint, params or {}, response.status_code,
+                           dict(response.headers), response.content)
+        return response
+
+
+def install_response_cache(client, mode=RECORD, cache=None):
+    """Swap a tweepy.Client's session for a CachingSession; returns the client"""
+    if mode == PASSTHROUGH:
+        return client
+    session = CachingSession(cache or ResponseCache(), mode=mode)
+    session.hooks = client.session.hooks
+    client.session = session
+    logger.info(f"Twitter response cache enabled in {mode} mode")
+    return client
+
+
+def bypass_response_cache(client):
+    """Return a copy of a client whose requests skip the response cache.
+
+    The copy shares the connection pool but never touches the cache's
+    SQLite index, so it can be used from worker threads. It also suits
+    traffic that should never be replayed, such as metric refreshes.
+    """
+    session = getattr(client, 'session', None)
+    if not isinstance(session, CachingSession) or session.mode == PASSTHROUGH:
+        return client
+    direct = copy.copy(client)
+    direct.session = copy.copy(session)
+    direct.session.mode = PASSTHROUGH
+    # Hooks attached to the copy (e.g. a rate-limit scheduler) stay off the original
+    direct.session.hooks = {event: list(hooks) for event, hooks in session.hooks.items()}
+    return direct
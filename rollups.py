@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+AI Conversation in Kenya - Materialized Rollups
+Keeps hourly and daily pre-aggregated tables per company, sector, query and
+platform so dashboards and notebooks do not rescan raw posts. Batches are
+folded in incrementally as the collectors save them.
+"""
+
+import os
+import sys
+import sqlite3
+import logging
+import argparse
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'rollups.db')
+
+GRAINS = {'hour': 'h', 'day': 'D'}
+DIMENSIONS = ['all', 'platform', 'company', 'sector', 'query']
+METRICS = ['posts', 'likes', 'comments', 'shares', 'engagement', 'max_engagement']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollups (
+    grain TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    value TEXT NOT NULL,
+    posts INTEGER NOT NULL,
+    likes INTEGER NOT NULL,
+    comments INTEGER NOT NULL,
+    shares INTEGER NOT NULL,
+    engagement INTEGER NOT NULL,
+    max_engagement INTEGER NOT NULL,
+    PRIMARY KEY (grain, dimension, value, bucket)
+);
+CREATE INDEX IF NOT EXISTS idx_rollups_bucket ON rollups (grain, dimension, bucket);
+CREATE TABLE IF NOT EXISTS folded_posts (
+    post_key TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS ingested_batches (
+    batch_id TEXT PRIMARY KEY,
+    rows INTEGER NOT NULL,
+    ingested_at TEXT NOT NULL
+);
+"""
+
+UPSERT = """
+INSERT INTO rollups (grain, bucket, dimension, value, posts, likes, comments, shares,
+                     engagement, max_engagement)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (grain, dimension, value, bucket) DO UPDATE SET
+    posts = posts + excluded.posts,
+    likes = likes + excluded.likes,
+    comments = comments + excluded.comments,
+    shares = shares + excluded.shares,
+    engagement = engagement + excluded.engagement,
+    max_engagement = MAX(max_engagement, excluded.max_engagement)
+"""
+
+
+def engagement_score(df):
+    """Weighted engagement used across the notebooks: likes + 2*comments + 3*shares"""
+    return df['likes'] + df['comments'] * 2 + df['shares'] * 3
+
+
+class RollupStore:
+    """SQLite-backed store of pre-aggregated post metrics"""
+
+    def __init__(self, path=ROLLUP_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def has_batch(self, batch_id):
+        row = self.conn.execute("SELECT 1 FROM ingested_batches WHERE batch_id = ?", (batch_id,)).fetchone()
+        return row is not None
+
+    def _unfolded(self, df):
+        """Drop posts that are repeated within ``df`` or were folded in by an earlier batch.
+
+        Returns the remaining posts and their keys.
+        """
+        from data_loader import post_keys
+
+        keys = post_keys(df)
+        first = ~keys.duplicated()
+        df, keys = df[first], keys[first]
+
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS batch_keys (post_key TEXT PRIMARY KEY)")
+        self.conn.execute("DELETE FROM batch_keys")
+        self.conn.executemany("INSERT INTO batch_keys VALUES (?)", ((key,) for key in keys))
+        seen = {row[0] for row in self.conn.execute(
+            "SELECT post_key FROM batch_keys WHERE post_key IN (SELECT post_key FROM folded_posts)")}
+        fresh = ~keys.isin(seen)
+        return df[fresh], keys[fresh]
+
+    def _aggregate(self, df):
+        """Yield upsert rows for every grain and dimension present in ``df``"""
+        post_date = pd.to_datetime(df['post_date'], format='ISO8601', errors='coerce', utc=True)
+        if 'posted_at' in df.columns:
+            # LinkedIn post_date is the scrape time; bucket by the parsed posting time
+            post_date = pd.to_datetime(df['posted_at'], format='ISO8601', errors='coerce', utc=True).fillna(post_date)
+        frame = pd.DataFrame({
+            'post_date': post_date,
+            'likes': pd.to_numeric(df.get('likes', 0), errors='coerce'),
+            'comments': pd.to_numeric(df.get('comments', 0), errors='coerce'),
+            'shares': pd.to_numeric(df.get('shares', 0), errors='coerce'),
+        }, index=df.index).fillna({'likes': 0, 'comments': 0, 'shares': 0})
+        frame = frame.astype({'likes': 'int64', 'comments': 'int64', 'shares': 'int64'})
+        frame['engagement'] = engagement_score(frame)
+        frame = frame[frame['post_date'].notna()]
+
+        for grain, freq in GRAINS.items():
+            buckets = frame['post_date'].dt.floor(freq).dt.strftime('%Y-%m-%dT%H:%M:%S')
+            for dimension in DIMENSIONS:
+                if dimension == 'all':
+                    values = pd.Series('all', index=frame.index)
+                elif dimension in df.columns:
+                    values = df.loc[frame.index, dimension].astype('string')
+                else:
+                    continue
+
+                grouped = frame.assign(bucket=buckets, value=values).dropna(subset=['value']).groupby(
+                    ['bucket', 'value'], observed=True).agg(
+                    posts=('engagement', 'size'),
+                    likes=('likes', 'sum'),
+                    comments=('comments', 'sum'),
+                    shares=('shares', 'sum'),
+                    engagement=('engagement', 'sum'),
+                    max_engagement=('engagement', 'max'),
+                )
+                for (bucket, value), row in zip(grouped.index, grouped.itertuples(index=False)):
+                    yield (grain, bucket, dimension, str(value)) + tuple(int(v) for v in row)
+
+    def update(self, df, batch_id=None):
+        """Fold a batch of posts (analysis schema) into the rollups.
+
+        Each post is counted once: posts already folded in (the same tweet
+        id or LinkedIn URN from an overlapping search or a re-parse) are
+        skipped, and a ``batch_id`` that was already ingested is skipped
+        entirely. Returns the number of rollup rows touched.
+        """
+        if batch_id is not None and self.has_batch(batch_id):
+            logger.info(f"Rollups already include batch {batch_id}, skipping")
+            return 0
+        if df is None or df.empty or 'post_date' not in df.columns:
+            return 0
+
+        with self.conn:
+            rows = len(df)
+            df, keys = self._unfolded(df)
+            touched = self.conn.executemany(UPSERT, self._aggregate(df)).rowcount
+            self.conn.executemany("INSERT INTO folded_posts VALUES (?)", ((key,) for key in keys))
+            if batch_id is not None:
+                self.conn.execute(
+                    "INSERT INTO ingested_batches (batch_id, rows, ingested_at) VALUES (?, ?, ?)",
+                    (batch_id, rows, pd.Timestamp.now(tz='UTC').isoformat()))
+        logger.info(f"Updated {touched} rollup rows from {len(df)} new posts ({rows - len(df)} already counted)")
+        return touched
+
+    def query(self, dimension='all', grain='day', start=None, end=None, values=None):
+        """Return the rollup time series for a dimension between ``start`` and ``end``"""
+        sql = ["SELECT bucket, value, " + ", ".join(METRICS),
+               "FROM rollups WHERE grain = ? AND dimension = ?"]
+        params = [grain, dimension]
+        if start is not None:
+            sql.append("AND bucket >= ?")
+            params.append(pd.Timestamp(start).strftime('%Y-%m-%dT%H:%M:%S'))
+        if end is not None:
+            sql.append("AND bucket < ?")
+            params.append(pd.Timestamp(end).strftime('%Y-%m-%dT%H:%M:%S'))
+        if values is not None:
+            values = list(values)
+            sql.append(f"AND value IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+        sql.append("ORDER BY bucket, value")
+
+        df = pd.read_sql_query(' '.join(sql), self.conn, params=params)
+        df['bucket'] = pd.to_datetime(df['bucket'], utc=True)
+        return df
+
+    def totals(self, dimension, start=None, end=None, grain='day'):
+        """Collapse a dimension's buckets into one row per value, sorted by engagement"""
+        df = self.query(dimension, grain, start, end)
+        if df.empty:
+            return pd.DataFrame(columns=METRICS + ['avg_engagement'])
+        totals = df.groupby('value').agg(
+            posts=('posts', 'sum'),
+            likes=('likes', 'sum'),
+            comments=('comments', 'sum'),
+            shares=('shares', 'sum'),
+            engagement=('engagement', 'sum'),
+            max_engagement=('max_engagement', 'max'),
+        )
+        totals['avg_engagement'] = (totals['engagement'] / totals['posts']).round(2)
+        return totals.sort_values('engagement', ascending=False)
+
+    def company_stats(self, start=None, end=None):
+        """Rollup-backed equivalent of analyze_top_organizations in linkedin_analysis.ipynb"""
+        totals = self.totals('company', start, end)
+        stats = pd.DataFrame({
+            'total_engagement': totals['engagement'],
+            'avg_engagement': totals['avg_engagement'],
+            'post_count': totals['posts'],
+            'total_likes': totals['likes'],
+            'total_comments': totals['comments'],
+            'total_shares': totals['shares'],
+        })
+        stats.index.name = 'company'
+        return stats
+
+    def rebuild(self, frames):
+        """Drop every rollup and refold the given ``(batch_id, frame)`` pairs"""
+        with self.conn:
+            self.conn.execute("DELETE FROM rollups")
+            self.conn.execute("DELETE FROM folded_posts")
+            self.conn.execute("DELETE FROM ingested_batches")
+        for batch_id, df in frames:
+            self.update(df, batch_id=batch_id)
+
+
+def update_rollups(df, source, batch_id, path=ROLLUP_DB):
+    """Fold a freshly saved collector frame into the rollup store"""
+    from data_loader import to_analysis_schema
+
+    try:
+        with RollupStore(path) as store:
+            store.update(to_analysis_schema(df, source), batch_id=batch_id)
+    except Exception as e:
+        logger.error(f"Error updating rollups for {batch_id}: {str(e)}")
+
+
+def main(argv=None):
+    from data_loader import DATA_DIR, SOURCES, find_source_files, read_source_csv
+
+    parser = argparse.ArgumentParser(description='Build and query post rollups')
+    parser.add_argument('--db', default=ROLLUP_DB, help='rollup database path')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    rebuild = sub.add_parser('rebuild', help='rebuild rollups from every collected CSV')
+    rebuild.add_argument('--data-dir', default=DATA_DIR)
+
+    show = sub.add_parser('show', help='print totals for a dimension')
+    show.add_argument('dimension', choices=DIMENSIONS)
+    show.add_argument('--start')
+    show.add_argument('--end')
+    show.add_argument('--limit', type=int, default=20)
+
+    args = parser.parse_args(argv)
+
+    with RollupStore(args.db) as store:
+        if args.command == 'rebuild':
+            frames = ((os.path.basename(path), read_source_csv(path, source))
+                      for source in SOURCES
+                      for path in find_source_files(source, args.data_dir, latest_only=False))
+            store.rebuild(frames)
+            print(f"Rebuilt rollups in {args.db}")
+        else:
+            print(store.totals(args.dimension, args.start, args.end).head(args.limit).to_string())
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    sys.exit(main())
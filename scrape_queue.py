@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+AI Conversation in Kenya - Scrape Job Queue
+Durable SQLite queue of per-company scrape jobs. Workers claim a job under a
+time-limited lease and keep it alive with heartbeats; a crashed worker's
+lease expires and the job is picked up again. Failures are retried with
+exponential backoff, finished jobs keep a pointer to the file they wrote,
+and re-enqueueing a run skips everything already done.
+
+Any number of worker processes can share one queue file. Workers on other
+hosts need the file on storage with working SQLite locking.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import random
+import sqlite3
+import logging
+import argparse
+import threading
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+QUEUE_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'scrape_queue.db')
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+STATUSES = (PENDING, LEASED, DONE, FAILED)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    job_key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    heartbeat_at REAL,
+    result TEXT,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    finished_at REAL,
+    UNIQUE (run_id, job_key)
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (run_id, status, available_at);
+"""
+
+
+def default_worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+class LeaseLost(Exception):
+    """Raised when a worker no longer holds the lease on its job"""
+
+
+class Job:
+    """A claimed job as seen by the worker holding its lease"""
+
+    def __init__(self, id, run_id, job_key, payload, attempts, lease_owner):
+        self.id = id
+        self.run_id = run_id
+        self.key = job_key
+        self.payload = payload
+        self.attempts = attempts
+        self.owner = lease_owner
+
+
+class JobQueue:
+    """SQLite-backed queue with leases, heartbeats and retry backoff.
+
+    ``clock`` is injectable so lease expiry and backoff can be driven by a
+    fake clock in tests.
+    """
+
+    def __init__(self, path=QUEUE_DB, lease_seconds=15 * 60, max_attempts=4,
+                 backoff_base=60.0, backoff_max=3600.0, clock=time.time):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.clock = clock
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Autocommit mode; write transactions are opened explicitly with BEGIN IMMEDIATE
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA busy_timeout = 30000")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _write(self, sql, params=()):
+        """Run one statement in its own write transaction; returns the cursor"""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = self.conn.execute(sql, params)
+            self.conn.execute("COMMIT")
+            return cursor
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def enqueue(self, run_id, jobs):
+        """Add ``(job_key, payload)`` pairs to a run; keys already in the run are left alone.
+
+        Returns the number of new jobs.
+        """
+        now = self.clock()
+        rows = [(run_id, key, json.dumps(payload), self.max_attempts, now, now) for key, payload in jobs]
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO jobs (run_id, job_key, payload, max_attempts, available_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)", rows)
+            added = self.conn.total_changes - before
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        logger.info(f"Enqueued {added} new jobs for run {run_id} ({len(rows) - added} already known)")
+        return added
+
+    def claim(self, run_id, worker_id=None):
+        """Lease the next available job of a run, or return None when nothing is ready.
+
+        Jobs whose lease expired (their worker died) are claimable again; a
+        job that has used up its attempts that way is marked failed instead.
+        """
+        worker_id = worker_id or default_worker_id()
+        now = self.clock()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, lease_owner = NULL, "
+                "last_error = COALESCE(last_error, 'lease expired') "
+                "WHERE run_id = ? AND status = 'leased' AND lease_expires < ? AND attempts >= max_attempts",
+                (now, run_id, now))
+            row = self.conn.execute(
+                "SELECT id, job_key, payload, attempts FROM jobs WHERE run_id = ? AND "
+                "((status = 'pending' AND available_at <= ?) OR (status = 'leased' AND lease_expires < ?)) "
+                "ORDER BY available_at, id LIMIT 1", (run_id, now, now)).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+            job_id, key, payload, attempts = row
+            self.conn.execute(
+                "UPDATE jobs SET status = 'leased', attempts = attempts + 1, lease_owner = ?, "
+                "lease_expires = ?, heartbeat_at = ? WHERE id = ?",
+                (worker_id, now + self.lease_seconds, now, job_id))
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        logger.info(f"{worker_id} claimed job {key} (attempt {attempts + 1})")
+        return Job(job_id, run_id, key, json.loads(payload), attempts + 1, worker_id)
+
+    def heartbeat(self, job):
+        """Extend the job's lease; raises LeaseLost if another worker has taken it over"""
+        now = self.clock()
+        cursor = self._write(
+            "UPDATE jobs SET lease_expires = ?, heartbeat_at = ? "
+            "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (now + self.lease_seconds, now, job.id, job.owner))
+        if cursor.rowcount == 0:
+            raise LeaseLost(f"Lease on job {job.key} is no longer held by {job.owner}")
+
+    def complete(self, job, result=None):
+        """Mark a job done, storing a pointer to its output (e.g. the CSV it wrote)"""
+        cursor = self._write(
+            "UPDATE jobs SET status = 'done', result = ?, finished_at = ?, lease_owner = NULL, "
+            "lease_expires = NULL, last_error = NULL WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (result, self.clock(), job.id, job.owner))
+        if cursor.rowcount == 0:
+            raise LeaseLost(f"Lease on job {job.key} is no longer held by {job.owner}")
+
+    def backoff(self, attempts):
+        """Delay before retry number ``attempts``: exponential with jitter, capped"""
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+        return delay * random.uniform(0.8, 1.2)
+
+    def fail(self, job, error):
+        """Release a failed job for a later retry, or mark it failed after the last attempt"""
+        now = self.clock()
+        row = self.conn.execute("SELECT attempts, max_attempts FROM jobs WHERE id = ?", (job.id,)).fetchone()
+        if row[0] >= row[1]:
+            self._write(
+                "UPDATE jobs SET status = 'failed', last_error = ?, finished_at = ?, lease_owner = NULL, "
+                "lease_expires = NULL WHERE id = ? AND lease_owner = ?", (str(error), now, job.id, job.owner))
+            logger.error(f"Job {job.key} failed permanently after {row[0]} attempts: {error}")
+            return False
+
+        delay = self.backoff(row[0])
+        self._write(
+            "UPDATE jobs SET status = 'pending', last_error = ?, available_at = ?, lease_owner = NULL, "
+            "lease_expires = NULL WHERE id = ? AND lease_owner = ?", (str(error), now + delay, job.id, job.owner))
+        logger.warning(f"Job {job.key} failed (attempt {row[0]}); retrying in {delay:.0f}s: {error}")
+        return True
+
+    def next_available(self, run_id):
+        """Seconds until a pending or leased job of the run could be claimed; None when none are left"""
+        now = self.clock()
+        row = self.conn.execute(
+            "SELECT MIN(CASE WHEN status = 'pending' THEN available_at ELSE lease_expires END) "
+            "FROM jobs WHERE run_id = ? AND status IN ('pending', 'leased')", (run_id,)).fetchone()
+        return None if row[0] is None else max(0.0, row[0] - now)
+
+    def retry_failed(self, run_id):
+        """Give permanently failed jobs of a run a fresh set of attempts"""
+        cursor = self._write(
+            "UPDATE jobs SET status = 'pending', attempts = 0, available_at = ?, finished_at = NULL "
+            "WHERE run_id = ? AND status = 'failed'", (self.clock(), run_id))
+        return cursor.rowcount
+
+    def counts(self, run_id):
+        rows = self.conn.execute("SELECT status, COUNT(*) FROM jobs WHERE run_id = ? GROUP BY status",
+                                 (run_id,)).fetchall()
+        counts = dict.fromkeys(STATUSES, 0)
+        counts.update(rows)
+        return counts
+
+    def jobs(self, run_id):
+        return pd.read_sql_query(
+            "SELECT job_key, status, attempts, lease_owner, result, last_error FROM jobs "
+            "WHERE run_id = ? ORDER BY id", self.conn, params=(run_id,))
+
+
+class Heartbeat:
+    """Context manager that renews a job's lease from a background thread.
+
+    Uses its own connection, since SQLite connections stay on their thread.
+    ``lost`` is set when the lease could not be renewed.
+    """
+
+    def __init__(self, queue, job, interval=None):
+        self.queue = queue
+        self.job = job
+        self.interval = interval or queue.lease_seconds / 3
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._beat, daemon=True)
+
+    def _beat(self):
+        queue = JobQueue(self.queue.path, lease_seconds=self.queue.lease_seconds, clock=self.queue.clock)
+        try:
+            while not self._stop.wait(self.interval):
+                try:
+                    queue.heartbeat(self.job)
+                except LeaseLost as e:
+                    logger.error(str(e))
+                    self.lost.set()
+                    return
+                except sqlite3.Error as e:
+                    logger.warning(f"Heartbeat for job {self.job.key} failed: {str(e)}")
+        finally:
+            queue.close()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def work(queue, run_id, handler, worker_id=None, wait=True, sleep=time.sleep):
+    """Claim and run jobs until the run has none left; returns the number completed.
+
+    ``handler(job)`` returns the result pointer; exceptions trigger a retry.
+    With ``wait``, the worker sleeps through retry backoffs and other
+    workers' leases instead of exiting while jobs are still outstanding.
+    """
+    worker_id = worker_id or default_worker_id()
+    completed = 0
+    while True:
+        job = queue.claim(run_id, worker_id)
+        if job is None:
+            delay = queue.next_available(run_id)
+            if delay is None or not wait:
+                break
+            sleep(max(delay, 1.0))
+            continue
+
+        with Heartbeat(queue, job) as heartbeat:
+            try:
+                result = handler(job)
+            except Exception as e:
+                if not heartbeat.lost.is_set():
+                    queue.fail(job, e)
+                continue
+
+        if heartbeat.lost.is_set():
+            logger.warning(f"Discarding completion of job {job.key}; its lease was taken over")
+            continue
+        try:
+            queue.complete(job, result)
+            completed += 1
+        except LeaseLost as e:
+            logger.warning(str(e))
+
+    logger.info(f"{worker_id} finished: {completed} jobs completed; run {run_id} status {queue.counts(run_id)}")
+    return completed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Manage the LinkedIn scrape job queue')
+    parser.add_argument('--db', default=QUEUE_DB, help='queue database path')
+    parser.add_argument('--run', required=True, help='run id, e.g. 20261019_060000 as logged by the scraper')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    sub.add_parser('enqueue', help='add every configured company page to the run')
+    sub.add_parser('status', help='show job states for the run')
+    sub.add_parser('retry-failed', help='requeue permanently failed jobs')
+
+    worker = sub.add_parser('work', help='start a scraper worker for the run')
+    worker.add_argument('--max-age-days', type=int, default=30)
+    worker.add_argument('--prune', action='store_true', help='remove harvested posts from the DOM')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'work':
+        from linkedin_scraper import LinkedInScraper
+
+        LinkedInScraper().run(max_age_days=args.max_age_days, prune=args.prune,
+                              run_id=args.run, queue_path=args.db)
+        return
+
+    with JobQueue(args.db) as queue:
+        if args.command == 'enqueue':
+            from linkedin_scraper import LinkedInScraper
+
+            queue.enqueue(args.run, LinkedInScraper(start_driver=False).COMPANY_PAGES.items())
+        elif args.command == 'retry-failed':
+            print(f"Requeued {queue.retry_failed(args.run)} failed jobs")
+        else:
+            print(queue.jobs(args.run).to_string())
+            print(queue.counts(args.run))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    sys.exit(main())
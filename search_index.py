@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+AI Conversation in Kenya - Full-Text Search Index
+SQLite FTS5 index over collected Twitter and LinkedIn posts with BM25
+ranking, phrase and prefix queries and filters on platform, company, sector,
+search query and date. Collectors add each saved batch incrementally, so
+notebooks no longer need to scan every CSV with ``str.contains``.
+"""
+
+import os
+import sys
+import sqlite3
+import logging
+import argparse
+
+import pandas as pd
+
+from data_loader import post_keys
+
+logger = logging.getLogger(__name__)
+
+SEARCH_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'search.db')
+
+# Column weights for bm25(): post text matters more than the author fields
+BM25_WEIGHTS = (1.0, 0.3)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id INTEGER PRIMARY KEY,
+    doc_key TEXT NOT NULL UNIQUE,
+    platform TEXT,
+    company TEXT,
+    sector TEXT,
+    query TEXT,
+    posted_at TEXT,
+    author TEXT,
+    content TEXT NOT NULL,
+    likes INTEGER,
+    comments INTEGER,
+    shares INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_posts_company ON posts (company, posted_at);
+CREATE INDEX IF NOT EXISTS idx_posts_sector ON posts (sector, posted_at);
+CREATE INDEX IF NOT EXISTS idx_posts_query ON posts (query, posted_at);
+CREATE INDEX IF NOT EXISTS idx_posts_posted ON posts (posted_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5 (
+    content, author,
+    content = 'posts', content_rowid = 'id',
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3 4'
+);
+CREATE TABLE IF NOT EXISTS ingested_batches (
+    batch_id TEXT PRIMARY KEY,
+    rows INTEGER NOT NULL,
+    ingested_at TEXT NOT NULL
+);
+"""
+
+FILTER_COLUMNS = ('platform', 'company', 'sector', 'query')
+
+
+class InvalidQuery(ValueError):
+    """Raised when a search expression is not valid FTS5 syntax"""
+
+
+def quote_terms(text):
+    """Turn free text into an FTS5 expression matching every word, e.g. AI-driven -> "AI-driven"
+
+    Each whitespace-separated word becomes a quoted phrase, so punctuation
+    inside words is matched literally instead of parsed as an operator.
+    """
+    return ' '.join('"{}"'.format(word.replace('"', '""')) for word in text.split())
+
+
+class SearchIndex:
+    """FTS5 index of posts with a plain table of filterable metadata"""
+
+    def __init__(self, path=SEARCH_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def has_batch(self, batch_id):
+        row = self.conn.execute("SELECT 1 FROM ingested_batches WHERE batch_id = ?", (batch_id,)).fetchone()
+        return row is not None
+
+    def _rows(self, df):
+        """Index rows from a frame in the shared analysis schema"""
+        df = df[df['content'].notna()]
+        posted = pd.to_datetime(df['post_date'], format='ISO8601', errors='coerce', utc=True)
+        if 'posted_at' in df.columns:
+            # LinkedIn post_date is the scrape time; prefer the parsed posting time
+            posted = pd.to_datetime(df['posted_at'], format='ISO8601', errors='coerce', utc=True).fillna(posted)
+
+        def column(name):
+            if name not in df.columns:
+                return [None] * len(df)
+            return df[name].astype(object).where(df[name].notna(), None).tolist()
+
+        def count(name):
+            if name not in df.columns:
+                return [None] * len(df)
+            values = pd.to_numeric(df[name], errors='coerce').astype('Int64')
+            return values.astype(object).where(values.notna(), None).tolist()
+
+        author = column('username') if 'username' in df.columns else column('author_name')
+        stamps = posted.dt.strftime('%Y-%m-%dT%H:%M:%S').astype(object).where(posted.notna(), None)
+        return zip(post_keys(df).tolist(), column('platform'), column('company'), column('sector'),
+                   column('query'), stamps.tolist(), author, df['content'].astype(str).tolist(),
+                   count('likes'), count('comments'), count('shares'))
+
+    def add(self, df, batch_id=None):
+        """Index new posts from an analysis-schema frame; already indexed posts are skipped.
+
+        Returns the number of posts added. A ``batch_id`` seen before is ignored.
+        """
+        if batch_id is not None and self.has_batch(batch_id):
+            logger.info(f"Batch {batch_id} already indexed; skipping")
+            return 0
+
+        with self.conn:
+            last_id = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM posts").fetchone()[0]
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO posts (doc_key, platform, company, sector, query, posted_at, "
+                "author, content, likes, comments, shares) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                self._rows(df))
+            # Only the rows inserted above reach the full-text index
+            added = self.conn.execute(
+                "INSERT INTO posts_fts (rowid, content, author) "
+                "SELECT id, content, COALESCE(author, '') FROM posts WHERE id > ?", (last_id,)).rowcount
+            if batch_id is not None:
+                self.conn.execute("INSERT INTO ingested_batches VALUES (?, ?, datetime('now'))",
+                                  (batch_id, len(df)))
+        logger.info(f"Indexed {added} new posts")
+        return added
+
+    def search(self, match, platform=None, company=None, sector=None, query=None,
+               since=None, until=None, limit=20):
+        """Rank posts for an FTS5 expression by BM25.
+
+        ``match`` uses FTS5 syntax: ``reskilling``, ``"machine learning"``
+        for phrases, ``automat*`` for prefixes, ``AND``/``OR``/``NOT`` and
+        ``NEAR(ai jobs, 5)``. Lower ``score`` is a better match. Raises
+        InvalidQuery for malformed expressions; ``quote_terms`` makes free
+        text safe to pass.
+        """
+        sql = [
+            "SELECT p.doc_key, p.platform, p.company, p.sector, p.query, p.posted_at, p.author,",
+            "p.content, p.likes, p.comments, p.shares,",
+            "snippet(posts_fts, 0, '[', ']', '...', 12) AS snippet,",
+            f"bm25(posts_fts, {', '.join(map(str, BM25_WEIGHTS))}) AS score",
+            "FROM posts_fts JOIN posts p ON p.id = posts_fts.rowid",
+        ]
+        where, params = self._where(match, platform, company, sector, query, since, until)
+        cursor = self._execute(' '.join(sql + where + ["ORDER BY score LIMIT ?"]), params + [limit])
+
+        df = pd.DataFrame(cursor.fetchall(), columns=[column[0] for column in cursor.description])
+        df['posted_at'] = pd.to_datetime(df['posted_at'], utc=True)
+        return df
+
+    def count(self, match, platform=None, company=None, sector=None, query=None, since=None, until=None):
+        """Number of posts matching an FTS5 expression and filters"""
+        where, params = self._where(match, platform, company, sector, query, since, until)
+        sql = ["SELECT COUNT(*) FROM posts_fts JOIN posts p ON p.id = posts_fts.rowid"] + where
+        return self._execute(' '.join(sql), params).fetchone()[0]
+
+    def _where(self, match, platform, company, sector, query, since, until):
+        """WHERE clause and parameters shared by search and count"""
+        where = ["WHERE posts_fts MATCH ?"]
+        params = [match]
+        for name, value in zip(FILTER_COLUMNS, (platform, company, sector, query)):
+            if value is not None:
+                where.append(f"AND p.{name} = ? COLLATE NOCASE")
+                params.append(value)
+        if since is not None:
+            where.append("AND p.posted_at >= ?")
+            params.append(pd.Timestamp(since).strftime('%Y-%m-%dT%H:%M:%S'))
+        if until is not None:
+            where.append("AND p.posted_at < ?")
+            params.append(pd.Timestamp(until).strftime('%Y-%m-%dT%H:%M:%S'))
+        return where, params
+
+    def _execute(self, sql, params):
+        try:
+            return self.conn.execute(sql, params)
+        except sqlite3.OperationalError as e:
+            if 'fts5' in str(e) or 'no such column' in str(e):
+                raise InvalidQuery(f"Invalid search expression {params[0]!r}: {str(e)}") from e
+            raise
+
+    def optimize(self):
+        """Merge FTS5 index segments after large loads"""
+        with self.conn:
+            self.conn.execute("INSERT INTO posts_fts (posts_fts) VALUES ('optimize')")
+
+    def rebuild(self, frames):
+        """Drop everything and re-index ``(batch_id, analysis frame)`` pairs"""
+        with self.conn:
+            self.conn.execute("DELETE FROM posts")
+            self.conn.execute("DELETE FROM ingested_batches")
+            self.conn.execute("INSERT INTO posts_fts (posts_fts) VALUES ('delete-all')")
+        for batch_id, df in frames:
+            self.add(df, batch_id=batch_id)
+        self.optimize()
+
+    def stats(self):
+        posts, batches = self.conn.execute(
+            "SELECT (SELECT COUNT(*) FROM posts), (SELECT COUNT(*) FROM ingested_batches)").fetchone()
+        return {'posts': posts, 'batches': batches}
+
+
+def update_search_index(df, source, batch_id, path=SEARCH_DB):
+    """Add a freshly saved collector frame to the search index"""
+    from data_loader import to_analysis_schema
+
+    try:
+        with SearchIndex(path) as index:
+            index.add(to_analysis_schema(df, source), batch_id=batch_id)
+    except Exception as e:
+        logger.error(f"Error updating search index for {batch_id}: {str(e)}")
+
+
+def main(argv=None):
+    from data_loader import DATA_DIR, SOURCES, find_source_files, read_source_csv
+
+    parser = argparse.ArgumentParser(description='Full-text search over collected posts')
+    parser.add_argument('--db', default=SEARCH_DB, help='search index path')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    rebuild = sub.add_parser('rebuild', help='re-index every collected CSV')
+    rebuild.add_argument('--data-dir', default=DATA_DIR)
+
+    sub.add_parser('stats', help='show index size')
+
+    search = sub.add_parser('search', help='run an FTS5 query, e.g. \'"digital skills" OR reskill*\'')
+    search.add_argument('match')
+    search.add_argument('--platform')
+    search.add_argument('--company')
+    search.add_argument('--sector')
+    search.add_argument('--query', help='Twitter search query the post was collected for')
+    search.add_argument('--since')
+    search.add_argument('--until')
+    search.add_argument('--limit', type=int, default=20)
+    search.add_argument('--plain', action='store_true',
+                        help='treat the query as plain words instead of FTS5 syntax')
+
+    args = parser.parse_args(argv)
+
+    with SearchIndex(args.db) as index:
+        if args.command == 'rebuild':
+            frames = ((os.path.basename(path), read_source_csv(path, source))
+                      for source in SOURCES
+                      for path in find_source_files(source, args.data_dir, latest_only=False))
+            index.rebuild(frames)
+            print(f"Rebuilt search index in {args.db}: {index.stats()['posts']} posts")
+        elif args.command == 'stats':
+            stats = index.stats()
+            print(f"{stats['posts']} posts from {stats['batches']} batches")
+        else:
+            match = quote_terms(args.match) if args.plain else args.match
+            try:
+                results = index.search(match, args.platform, args.company, args.sector, args.query,
+                                       args.since, args.until, args.limit)
+            except InvalidQuery as e:
+                print(f"{str(e)}\nQuote special characters or pass --plain to search for the words as typed.")
+                return 1
+            for row in results.itertuples():
+                date = row.posted_at.strftime('%Y-%m-%d') if pd.notna(row.posted_at) else '-'
+                print(f"{row.score:8.2f}  {date}  {row.platform or '-'}  {row.company or row.author or '-'}")
+                print(f"          {row.snippet}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    sys.exit(main())
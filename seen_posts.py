@@ -0,0 +1,59 @@
+"""
+AI Conversation in Kenya - Seen LinkedIn Posts
+Records the URN of every post the scraper has harvested from a company page,
+relevant to the tracked keywords or not, so later runs can stop scrolling as
+soon as they reach posts that were already looked at.
+"""
+
+import os
+import sqlite3
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SEEN_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'seen_posts.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen_posts (
+    company_handle TEXT NOT NULL,
+    post_urn TEXT NOT NULL,
+    first_seen TEXT NOT NULL,
+    PRIMARY KEY (company_handle, post_urn)
+);
+"""
+
+
+class SeenPostStore:
+    """SQLite set of (company_handle, post_urn) pairs harvested so far"""
+
+    def __init__(self, path=SEEN_DB):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, company_handle, urns):
+        """Record harvested URNs for a company; returns how many were new"""
+        stamp = pd.Timestamp.now(tz='UTC').strftime('%Y-%m-%dT%H:%M:%S')
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany("INSERT OR IGNORE INTO seen_posts VALUES (?, ?, ?)",
+                                  ((company_handle, urn, stamp) for urn in urns))
+            return self.conn.total_changes - before
+
+    def known(self):
+        """All seen URNs as {company_handle: set of URNs}"""
+        known = {}
+        for handle, urn in self.conn.execute("SELECT company_handle, post_urn FROM seen_posts"):
+            known.setdefault(handle, set()).add(urn)
+        return known
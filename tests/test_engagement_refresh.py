@@ -0,0 +1,65 @@
+"""refresh_metrics with a real tweepy client whose session carries the response cache"""
+
+import json
+import threading
+from urllib.parse import urlparse, parse_qs
+
+import pandas as pd
+import requests
+import tweepy
+from requests.adapters import BaseAdapter
+
+from engagement_refresh import MetricSnapshotStore, refresh_metrics
+from response_cache import RECORD, ResponseCache, install_response_cache
+
+
+class StubTweetLookup(BaseAdapter):
+    """Answers GET /2/tweets in-process; ids in ``deleted`` are left out of the response"""
+
+    def __init__(self, deleted=()):
+        super().__init__()
+        self.deleted = set(deleted)
+        self.threads = set()
+
+    def send(self, request, **kwargs):
+        self.threads.add(threading.get_ident())
+        ids = parse_qs(urlparse(request.url).query)['ids'][0].split(',')
+        data = [{'id': tweet_id, 'text': 'post', 'edit_history_tweet_ids': [tweet_id],
+                 'public_metrics': {'retweet_count': 1, 'like_count': int(tweet_id) % 7,
+                                    'reply_count': 0, 'quote_count': 0}}
+                for tweet_id in ids if tweet_id not in self.deleted]
+
+        response = requests.Response()
+        response.status_code = 200
+        response.headers.update({'content-type': 'application/json', 'x-rate-limit-limit': '300',
+                                 'x-rate-limit-remaining': '299', 'x-rate-limit-reset': '9999999999'})
+        response._content = json.dumps({'data': data}).encode()
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def test_refresh_with_workers_uses_cached_client(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache'))
+    client = install_response_cache(tweepy.Client(bearer_token='test'), mode=RECORD, cache=cache)
+    adapter = StubTweetLookup(deleted={'1003'})
+    client.session.mount('https://api.twitter.com/', adapter)
+
+    store = MetricSnapshotStore(str(tmp_path / 'engagement.db'))
+    created = pd.Timestamp.now(tz='UTC') - pd.Timedelta(hours=2)
+    store.register(pd.DataFrame({'tweet_id': [str(1000 + i) for i in range(250)],
+                                 'created_at': [created.isoformat()] * 250}))
+
+    written = refresh_metrics(client, store, workers=4)
+
+    assert written == 249
+    assert len(adapter.threads) > 1
+    latest = store.latest()
+    assert len(latest) == 249 and '1003' not in set(latest['tweet_id'])
+    assert store.due() == []
+    # Refresh traffic is never stored in the response cache
+    assert cache.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 0
+    assert not any(client.session.hooks['response'])
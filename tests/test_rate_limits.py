@@ -0,0 +1,163 @@
+"""RateLimitScheduler against a stub HTTP server that answers with 429s and reset headers"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from rate_limits import RateLimitScheduler, SEARCH_RECENT, USER_BY_ID
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class StubTwitter(ThreadingHTTPServer):
+    """Serves every path; the first ``limited`` search requests get a 429 with a fresh reset time"""
+
+    def __init__(self, clock, limited=1, window=60, remaining=10):
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.clock = clock
+        self.limited = limited
+        self.window = window
+        self.remaining = remaining
+        self.requests = []
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        path = self.path.split('?')[0]
+        server.requests.append(path)
+
+        if path == SEARCH_RECENT and server.limited:
+            server.limited -= 1
+            self._reply(429, {'title': 'Too Many Requests'}, remaining=0, reset=server.clock() + server.window)
+            return
+        self._reply(200, {'data': [{'id': '1', 'text': path}]}, remaining=server.remaining,
+                    reset=server.clock() + server.window)
+
+    def _reply(self, status, body, remaining, reset):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('content-type', 'application/json')
+        self.send_header('x-rate-limit-limit', '15')
+        self.send_header('x-rate-limit-remaining', str(remaining))
+        self.send_header('x-rate-limit-reset', str(int(reset)))
+        self.send_header('content-length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubClient:
+    """Stands in for tweepy.Client: a requests session that raises on HTTP errors"""
+
+    def __init__(self, base):
+        self.base = base
+        self.session = requests.Session()
+
+    def get(self, path):
+        response = self.session.get(self.base + path, timeout=5)
+        response.raise_for_status()
+        return response.json()
+
+
+@pytest.fixture
+def stub():
+    clock = FakeClock()
+    server = StubTwitter(clock)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield clock, server, StubClient(f'http://127.0.0.1:{server.server_address[1]}')
+    server.shutdown()
+    server.server_close()
+
+
+def test_rate_limited_endpoint_cools_down_while_others_continue(stub):
+    clock, server, client = stub
+    scheduler = RateLimitScheduler(clock=clock, sleep=clock.sleep).attach(client)
+
+    search = scheduler.submit(SEARCH_RECENT, client.get, SEARCH_RECENT)
+    users = [scheduler.submit(USER_BY_ID, client.get, f'/2/users/{i}') for i in range(3)]
+    completed = scheduler.run()
+
+    assert all(job.error is None for job in completed)
+    assert search.attempts == 2
+    # The user lookups were all served before the search was retried after its reset
+    assert server.requests[-1] == SEARCH_RECENT
+    assert server.requests.count(SEARCH_RECENT) == 2
+    assert sum(clock.sleeps) == pytest.approx(60, abs=1)
+    assert [job.id for job in completed][-1] == search.id
+    assert len(completed) == len(users) + 1
+
+
+def test_budget_from_headers_delays_requests_until_reset(stub):
+    clock, server, client = stub
+    scheduler = RateLimitScheduler(clock=clock, sleep=clock.sleep).attach(client)
+    scheduler.update_from_headers(USER_BY_ID, {'x-rate-limit-limit': '15', 'x-rate-limit-remaining': '0',
+                                                'x-rate-limit-reset': str(clock() + 30)})
+
+    scheduler.submit(USER_BY_ID, client.get, '/2/users/1')
+    completed = scheduler.run()
+
+    assert completed[0].error is None
+    assert clock.sleeps and sum(clock.sleeps) == pytest.approx(30)
+
+
+def test_budget_from_responses_throttles_queued_jobs(stub):
+    clock, server, client = stub
+    server.remaining = 0
+    scheduler = RateLimitScheduler(clock=clock, sleep=clock.sleep).attach(client)
+
+    # Queued under the request path; the budget from /2/users/1 must apply to /2/users/2
+    first = scheduler.submit('/2/users/1', client.get, '/2/users/1')
+    second = scheduler.submit(USER_BY_ID, client.get, '/2/users/2')
+    completed = scheduler.run()
+
+    assert first.endpoint == second.endpoint == USER_BY_ID
+    assert [job.id for job in completed] == [first.id, second.id]
+    assert sum(clock.sleeps) == pytest.approx(60, abs=1)
+
+
+def test_gives_up_after_max_retries(stub):
+    clock, server, client = stub
+    server.limited = 10
+    scheduler = RateLimitScheduler(max_retries=2, clock=clock, sleep=clock.sleep).attach(client)
+
+    job = scheduler.submit(SEARCH_RECENT, client.get, SEARCH_RECENT)
+    scheduler.run()
+
+    assert job.attempts == 3
+    assert isinstance(job.error, requests.HTTPError)
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_failing_result_handler_does_not_abort_run(stub, workers):
+    clock, server, client = stub
+    scheduler = RateLimitScheduler(clock=clock, sleep=clock.sleep).attach(client)
+    results = []
+
+    def broken(response):
+        raise KeyError('users')
+
+    first = scheduler.submit(USER_BY_ID, client.get, '/2/users/1', on_result=broken)
+    second = scheduler.submit(USER_BY_ID, client.get, '/2/users/2', on_result=results.append)
+    completed = scheduler.run(workers=workers)
+
+    assert len(completed) == 2
+    assert isinstance(first.error, KeyError)
+    assert second.error is None and len(results) == 1
@@ -0,0 +1,59 @@
+"""
+AI Conversation in Kenya - Text Normalization
+Shared, vectorized cleaning stage for post text. Runs on Arrow string kernels
+(which release the GIL) and processes large frames in parallel chunks, so the
+collectors can store cleaned text next to the raw text once per record.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# RE2 patterns (Arrow's regex engine); \p{...} classes keep the steps Unicode-aware
+URL_PATTERN = r'(?:https?://|www\.)\S+'
+MENTION_PATTERN = r'@[\p{L}\p{N}_]+'
+APOSTROPHE_PATTERN = r"['\x{2019}]"
+NON_WORD_PATTERN = r'[^\p{L}\p{N}_\s]+'
+DIGIT_PATTERN = r'\p{N}+'
+WHITESPACE_PATTERN = r'\s+'
+
+CHUNK_SIZE = 100_000
+
+
+def _normalize_array(arr, strip_digits):
+    """Run the cleaning kernels over one Arrow string array"""
+    arr = pc.utf8_normalize(arr, form='NFKC')
+    arr = pc.utf8_lower(arr)
+    arr = pc.replace_substring_regex(arr, URL_PATTERN, ' ')
+    arr = pc.replace_substring_regex(arr, MENTION_PATTERN, ' ')
+    arr = pc.replace_substring_regex(arr, APOSTROPHE_PATTERN, '')
+    # Emoji and other symbols fall outside letters/numbers, so this drops them too
+    arr = pc.replace_substring_regex(arr, NON_WORD_PATTERN, ' ')
+    if strip_digits:
+        arr = pc.replace_substring_regex(arr, DIGIT_PATTERN, ' ')
+    arr = pc.replace_substring_regex(arr, WHITESPACE_PATTERN, ' ')
+    return pc.utf8_trim_whitespace(arr)
+
+
+def normalize_text(series, strip_digits=True, workers=None, chunk_size=CHUNK_SIZE):
+    """Lowercase and strip URLs, mentions, emoji, punctuation and extra whitespace.
+
+    Missing values stay missing. Series longer than ``chunk_size`` are split and
+    cleaned on a thread pool. Returns an Arrow-backed ``string`` Series aligned
+    with the input index.
+    """
+    series = pd.Series(series)
+    values = pa.array(series.astype('string').array, type=pa.string())
+
+    if len(values) <= chunk_size:
+        cleaned = _normalize_array(values, strip_digits)
+    else:
+        chunks = [values.slice(start, chunk_size) for start in range(0, len(values), chunk_size)]
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            cleaned = pa.chunked_array(pool.map(lambda chunk: _normalize_array(chunk, strip_digits), chunks))
+
+    return pd.Series(pd.arrays.ArrowStringArray(pc.cast(cleaned, pa.string())),
+                     index=series.index, name=series.name)
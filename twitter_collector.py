@@ -1,10 +1,15 @@
 import os
 import tweepy
-import pandas as pd
-import json
 import logging
 from datetime import datetime
 from dotenv import load_dotenv
+from records import TweetRecord, TweetBatch
+from rate_limits import RateLimitScheduler, SEARCH_RECENT
+from engagement_refresh import MetricSnapshotStore, queue_refresh, register_collected_tweets
+from response_cache import install_response_cache, RECORD
+from rollups import update_rollups
+from search_index import update_search_index
+from text_cleaning import normalize_text
 
 # Set up logging
 logging.basicConfig(
@@ -29,58 +34,82 @@ def setup_twitter_client():
             consumer_secret=os.getenv('TWITTER_API_SECRET'),
             access_token=os.getenv('TWITTER_ACCESS_TOKEN'),
             access_token_secret=os.getenv('TWITTER_ACCESS_TOKEN_SECRET'),
-            wait_on_rate_limit=True
+            # RateLimitScheduler handles 429s per endpoint instead of blocking the process
+            wait_on_rate_limit=False
         )
         logger.info("Successfully authenticated with Twitter API")
-        return client
+        # record (default), replay (offline, from stored responses) or passthrough
+        return install_response_cache(client, mode=os.getenv('TWITTER_CACHE_MODE', RECORD))
     except Exception as e:
         logger.error(f"Error authenticating with Twitter API: {str(e)}")
         raise
 
-def collect_tweets(client, query, max_results=100):
-    """Collect tweets for a specific query"""
-    tweets_data = []
+def search_params(query, max_results=100):
+    """Keyword arguments for a search_recent_tweets call"""
+    return {
+        'query': query,
+        'max_results': max_results,
+        'tweet_fields': ['created_at', 'public_metrics', 'author_id'],
+        'user_fields': ['username', 'public_metrics', 'verified'],
+        'expansions': ['author_id']
+    }
+
+def parse_search_response(response, query, batch=None):
+    """Append the tweets from a search response to a TweetBatch"""
+    if batch is None:
+        batch = TweetBatch()
     
-    try:
-        # Search tweets
-        response = client.search_recent_tweets(
-            query=query,
-            max_results=max_results,
-            tweet_fields=['created_at', 'public_metrics', 'author_id'],
-            user_fields=['username', 'public_metrics', 'verified'],
-            expansions=['author_id']
-        )
+    if not response.data:
+        logger.warning(f"No tweets found for query: {query}")
+        return batch
         
-        if not response.data:
-            logger.warning(f"No tweets found for query: {query}")
-            return []
-            
-        # Process users lookup
-        users = {user.id: user for user in response.includes['users']}
+    # Process users lookup
+    users = {user.id: user for user in response.includes['users']}
+    
+    for tweet in response.data:
+        user = users.get(tweet.author_id)
         
-        for tweet in response.data:
-            user = users.get(tweet.author_id, {})
-            
-            tweet_data = {
-                'created_at': tweet.created_at,
-                'text': tweet.text,
-                'username': user.username if user else None,
-                'user_followers': user.public_metrics['followers_count'] if user else None,
-                'user_verified': user.verified if user else None,
-                'retweet_count': tweet.public_metrics['retweet_count'],
-                'like_count': tweet.public_metrics['like_count'],
-                'reply_count': tweet.public_metrics['reply_count'],
-                'quote_count': tweet.public_metrics['quote_count'],
-                'query': query
-            }
-            tweets_data.append(tweet_data)
-            
-        logger.info(f"Collected {len(tweets_data)} tweets for query: {query}")
+        batch.append(TweetRecord(
+            tweet_id=str(tweet.id),
+            created_at=tweet.created_at,
+            text=tweet.text,
+            username=user.username if user else None,
+            user_followers=user.public_metrics['followers_count'] if user else None,
+            user_verified=user.verified if user else None,
+            retweet_count=tweet.public_metrics['retweet_count'],
+            like_count=tweet.public_metrics['like_count'],
+            reply_count=tweet.public_metrics['reply_count'],
+            quote_count=tweet.public_metrics['quote_count'],
+            query=query
+        ))
         
-    except Exception as e:
-        logger.error(f"Error collecting tweets for query {query}: {str(e)}")
+    logger.info(f"Collected {len(response.data)} tweets for query: {query}")
+    return batch
+
+def collect_tweets(client, query, max_results=100, batch=None, scheduler=None):
+    """Collect tweets for a specific query into a TweetBatch.
+
+    Runs a single search through ``scheduler`` (a new one by default), so it
+    waits out rate limits instead of failing; main() queues all queries at once.
+    """
+    if batch is None:
+        batch = TweetBatch()
+    own_scheduler = scheduler is None
+    if own_scheduler:
+        scheduler = RateLimitScheduler().attach(client)
+    
+    try:
+        job = scheduler.submit(SEARCH_RECENT, client.search_recent_tweets,
+                               on_result=lambda response: parse_search_response(response, query, batch),
+                               **search_params(query, max_results))
+        scheduler.run()
+        if job.error is not None:
+            logger.error(f"Error collecting tweets for query {query}: {str(job.error)}")
+    finally:
+        if own_scheduler:
+            scheduler.detach(client)
     
-    return tweets_data
+    return batch
 
 def main():
     # Initialize Twitter client
@@ -95,26 +124,43 @@ def main():
         'AI (startup OR innovation) (Kenya OR Nairobi) -is:retweet'
     ]
     
-    # Collect tweets for each query
-    all_tweets = []
+    # Queue every query; the scheduler interleaves them within the rate budget
+    scheduler = RateLimitScheduler().attach(client)
+    batch = TweetBatch()
     for query in search_queries:
-        tweets = collect_tweets(client, query)
-        all_tweets.extend(tweets)
+        scheduler.submit(SEARCH_RECENT, client.search_recent_tweets,
+                         on_result=lambda response, query=query: parse_search_response(response, query, batch),
+                         **search_params(query))
+    
+    # Metric refreshes for earlier tweets use the tweet lookup budget, so they
+    # go out while the searches wait for theirs
+    store = MetricSnapshotStore()
+    try:
+        register_collected_tweets(store, 'data')
+        queue_refresh(client, store, scheduler)
+        for job in scheduler.run():
+            if job.error is not None and job.endpoint == SEARCH_RECENT:
+                logger.error(f"Error collecting tweets for query {job.kwargs['query']}: {str(job.error)}")
+    finally:
+        store.close()
     
     # Convert to DataFrame and remove duplicates
-    df = pd.DataFrame(all_tweets)
+    df = batch.to_dataframe()
     df = df.drop_duplicates(subset=['text'])
+    df['clean_text'] = normalize_text(df['text'])
     
     # Save to CSV with timestamp
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     filename = f'data/twitter_data_{timestamp}.csv'
     df.to_csv(filename, index=False)
     logger.info(f"Saved {len(df)} unique tweets to {filename}")
+    update_rollups(df, 'twitter', os.path.basename(filename))
+    update_search_index(df, 'twitter', os.path.basename(filename))
     
     # Save raw data as backup
-    with open(f'data/twitter_raw_{timestamp}.json', 'w') as f:
-        json.dump(all_tweets, f)
-    logger.info(f"Saved raw data backup to data/twitter_raw_{timestamp}.json")
+    with open(f'data/twitter_raw_{timestamp}.jsonl', 'w', encoding='utf-8') as f:
+        batch.write_json_lines(f)
+    logger.info(f"Saved raw data backup to data/twitter_raw_{timestamp}.jsonl")
 
 if __name__ == "__main__":
     try: